@@ -35,6 +35,55 @@ const db = admin.firestore();
 const games = new Map();
 const players = new Map();
 
+// Rooms listed in the lobby, kept current as rooms change rather than rebuilt
+// from `games` per request. Sockets in the lobby channel get each change
+// pushed, stamped with a version so clients can order it against a snapshot.
+const LOBBY_CHANNEL = 'lobby';
+const activeRooms = new Map();
+let lobbyVersion = 0;
+
+// Snake cells travel as [x, y] pairs (json) or as packed little-endian
+// uint16 indices x * size + y (binary), negotiated per socket
+const WIRE_JSON = 'json';
+const WIRE_BINARY = 'binary';
+const WIRE_FORMATS = [WIRE_JSON, WIRE_BINARY];
+const MAX_BINARY_SIZE = 256;
+
+function encodeCells(cells, size) {
+  const buffer = Buffer.alloc(cells.length * 2);
+  cells.forEach(([x, y], i) => buffer.writeUInt16LE(x * size + y, i * 2));
+  return buffer;
+}
+
+function decodeCells(buffer, size) {
+  const cells = [];
+  for (let offset = 0; offset + 1 < buffer.length; offset += 2) {
+    const index = buffer.readUInt16LE(offset);
+    cells.push([Math.floor(index / size), index % size]);
+  }
+  return cells;
+}
+
+// Copy of a snake message (or game state) with cells in the given format
+function formatCells(message, format, size) {
+  if (format !== WIRE_BINARY || size > MAX_BINARY_SIZE) return message;
+
+  const packed = { ...message };
+  if (Array.isArray(message.cells)) packed.cells = encodeCells(message.cells, size);
+  if (Array.isArray(message.add)) packed.add = encodeCells(message.add, size);
+  if (Array.isArray(message.snakes)) {
+    packed.snakes = message.snakes.map(([id, snake]) => [id, formatCells(snake, format, size)]);
+  }
+  return packed;
+}
+
+// Incoming binary cells back to [x, y] pairs, the form rooms store
+function parseCells(snakeData, size) {
+  if (Buffer.isBuffer(snakeData.cells)) snakeData.cells = decodeCells(snakeData.cells, size);
+  if (Buffer.isBuffer(snakeData.add)) snakeData.add = decodeCells(snakeData.add, size);
+  return snakeData;
+}
+
 class GameRoom {
   constructor(id, hostId, config) {
     this.id = id;
@@ -50,6 +99,10 @@ class GameRoom {
     this.winner = null;
   }
 
+  boardSize() {
+    return this.config.table_size || 20;
+  }
+
   addPlayer(playerId, playerData) {
     this.players.set(playerId, {
       id: playerId,
@@ -69,6 +122,43 @@ class GameRoom {
     this.snakes.set(playerId, snakeData);
   }
 
+  // Apply a sequenced delta (or keyframe). Returns false on a sequence gap.
+  applySnakeDelta(playerId, delta) {
+    const { seq, direction, alive, tick } = delta;
+
+    if (delta.keyframe) {
+      this.snakes.set(playerId, { cells: delta.cells || [], seq, direction, alive, tick });
+      return true;
+    }
+
+    const snake = this.snakes.get(playerId);
+    if (!snake || snake.seq === undefined || seq > snake.seq + 1) {
+      return false;
+    }
+    if (seq <= snake.seq) {
+      return true; // Duplicate we already applied
+    }
+
+    snake.cells.splice(0, delta.drop || 0);
+    for (const cell of delta.add || []) {
+      snake.cells.push(cell);
+    }
+    snake.seq = seq;
+    snake.direction = direction;
+    snake.alive = alive;
+    snake.tick = tick; // Client sim tick this body reflects
+    return true;
+  }
+
+  // Send a snake message to every wire format group of the room
+  emitSnakes(event, message, except) {
+    for (const format of WIRE_FORMATS) {
+      let target = io.to(`${this.id}:${format}`);
+      if (except) target = target.except(except.id);
+      target.emit(event, formatCells(message, format, this.boardSize()));
+    }
+  }
+
   getState() {
     return {
       id: this.id,
@@ -81,18 +171,40 @@ class GameRoom {
   }
 }
 
-// REST API Endpoints
-app.get('/health', (req, res) => {
-  res.json({ status: 'ok', timestamp: Date.now() });
-});
+function roomSummary(game) {
+  return {
+    id: game.id,
+    playerCount: game.players.size,
+    state: game.state
+  };
+}
 
-app.get('/api/stats/:userId', async (req, res) => {
+// Publish a room's current summary to the lobby, finished rooms leave it
+function publishRoom(game) {
+  if (game.state === 'finished') {
+    unpublishRoom(game.id);
+    return;
+  }
+  const event = activeRooms.has(game.id) ? 'room_updated' : 'room_added';
+  const room = roomSummary(game);
+  activeRooms.set(game.id, room);
+  io.to(LOBBY_CHANNEL).emit(event, { room, version: ++lobbyVersion });
+}
+
+function unpublishRoom(roomId) {
+  if (activeRooms.delete(roomId)) {
+    io.to(LOBBY_CHANNEL).emit('room_removed', { roomId, version: ++lobbyVersion });
+  }
+}
+
+// REST handlers, each resolving to { status, body }. Express serves them over
+// HTTP and the http_request socket event over an already open connection.
+async function getStats(userId) {
   try {
-    const userId = req.params.userId;
     const statsDoc = await db.collection('users').doc(userId).get();
     
     if (!statsDoc.exists) {
-      return res.status(404).json({ error: 'User not found' });
+      return { status: 404, body: { error: 'User not found' } };
     }
 
     const gamesSnapshot = await db.collection('games')
@@ -106,19 +218,22 @@ app.get('/api/stats/:userId', async (req, res) => {
       games.push({ id: doc.id, ...doc.data() });
     });
 
-    res.json({
-      stats: statsDoc.data(),
-      recentGames: games
-    });
+    return {
+      status: 200,
+      body: {
+        stats: statsDoc.data(),
+        recentGames: games
+      }
+    };
   } catch (error) {
     console.error('Error fetching stats:', error);
-    res.status(500).json({ error: 'Internal server error' });
+    return { status: 500, body: { error: 'Internal server error' } };
   }
-});
+}
 
-app.get('/api/leaderboard', async (req, res) => {
+async function getLeaderboard(limitParam) {
   try {
-    const limit = parseInt(req.query.limit) || 10;
+    const limit = parseInt(limitParam) || 10;
     const usersSnapshot = await db.collection('users')
       .orderBy('totalScore', 'desc')
       .limit(limit)
@@ -129,32 +244,76 @@ app.get('/api/leaderboard', async (req, res) => {
       leaderboard.push({ id: doc.id, ...doc.data() });
     });
 
-    res.json({ leaderboard });
+    return { status: 200, body: { leaderboard } };
   } catch (error) {
     console.error('Error fetching leaderboard:', error);
-    res.status(500).json({ error: 'Internal server error' });
+    return { status: 500, body: { error: 'Internal server error' } };
+  }
+}
+
+function getHealth() {
+  return { status: 200, body: { status: 'ok', timestamp: Date.now() } };
+}
+
+function getActiveGames() {
+  return { status: 200, body: { games: Array.from(activeRooms.values()) } };
+}
+
+// Route a GET path (with query string) to its handler
+async function routeRequest(method, path) {
+  if (method !== 'GET') {
+    return { status: 405, body: { error: 'Method not allowed' } };
   }
+
+  const url = new URL(path, 'http://localhost');
+  const stats = url.pathname.match(/^\/api\/stats\/([^/]+)$/);
+  if (stats) return getStats(decodeURIComponent(stats[1]));
+  if (url.pathname === '/api/leaderboard') return getLeaderboard(url.searchParams.get('limit'));
+  if (url.pathname === '/api/games/active') return getActiveGames();
+  if (url.pathname === '/health') return getHealth();
+  return { status: 404, body: { error: 'Not found' } };
+}
+
+function send(res, { status, body }) {
+  res.status(status).json(body);
+}
+
+// REST API Endpoints
+app.get('/health', (req, res) => {
+  send(res, getHealth());
+});
+
+app.get('/api/stats/:userId', async (req, res) => {
+  send(res, await getStats(req.params.userId));
+});
+
+app.get('/api/leaderboard', async (req, res) => {
+  send(res, await getLeaderboard(req.query.limit));
 });
 
 app.get('/api/games/active', (req, res) => {
-  const activeGames = [];
-  games.forEach((game, id) => {
-    if (game.state !== 'finished') {
-      activeGames.push({
-        id: game.id,
-        playerCount: game.players.size,
-        state: game.state
-      });
-    }
-  });
-  res.json({ games: activeGames });
+  send(res, getActiveGames());
 });
 
+// Answer a client call, echoing its request id so the reply can be matched
+function reply(ack, data, body) {
+  if (typeof ack === 'function') {
+    ack({ ...body, requestId: data && data.requestId });
+  }
+}
+
+// Optional socket events this server handles, announced in the handshake so
+// clients never have to guess from failures
+const SOCKET_FEATURES = ['http_request', 'subscribe_lobby'];
+
 // Socket.IO Events
 io.on('connection', (socket) => {
   console.log('New client connected:', socket.id);
 
-  socket.on('authenticate', async (data) => {
+  socket.data.wire = socket.handshake.auth?.wire === WIRE_BINARY ? WIRE_BINARY : WIRE_JSON;
+  socket.emit('wire_format', { format: socket.data.wire, features: SOCKET_FEATURES });
+
+  socket.on('authenticate', async (data, ack) => {
     try {
       const { idToken, username } = data;
       const decodedToken = await admin.auth().verifyIdToken(idToken);
@@ -172,17 +331,41 @@ io.on('connection', (socket) => {
       }, { merge: true });
 
       socket.emit('authenticated', { userId, username });
+      reply(ack, data, { ok: true, userId, username });
       console.log(`User authenticated: ${username} (${userId})`);
     } catch (error) {
       console.error('Authentication error:', error);
       socket.emit('auth_error', { message: 'Authentication failed' });
+      reply(ack, data, { ok: false, message: 'Authentication failed' });
     }
   });
 
-  socket.on('create_room', (data) => {
+  // REST endpoints over this socket, answered through the ack
+  socket.on('http_request', async (data, ack) => {
+    let result;
+    try {
+      result = await routeRequest(data.method || 'GET', data.path || '/');
+    } catch (error) {
+      result = { status: 400, body: { error: 'Bad request' } };
+    }
+    reply(ack, data, { ok: result.status < 400, ...result });
+  });
+
+  // Join the lobby channel: every active room now, changes pushed after
+  socket.on('subscribe_lobby', (data, ack) => {
+    socket.join(LOBBY_CHANNEL);
+    reply(ack, data, {
+      ok: true,
+      rooms: Array.from(activeRooms.values()),
+      version: lobbyVersion
+    });
+  });
+
+  socket.on('create_room', (data, ack) => {
     const player = players.get(socket.id);
     if (!player) {
       socket.emit('error', { message: 'Not authenticated' });
+      reply(ack, data, { ok: false, message: 'Not authenticated' });
       return;
     }
 
@@ -194,20 +377,24 @@ io.on('connection', (socket) => {
     });
 
     games.set(roomId, game);
+    publishRoom(game);
     socket.join(roomId);
+    socket.join(`${roomId}:${socket.data.wire}`);
 
     socket.emit('room_created', {
       roomId,
       game: game.getState()
     });
+    reply(ack, data, { ok: true, roomId, game: game.getState() });
 
     console.log(`Room created: ${roomId} by ${player.username}`);
   });
 
-  socket.on('join_room', (data) => {
+  socket.on('join_room', (data, ack) => {
     const player = players.get(socket.id);
     if (!player) {
       socket.emit('error', { message: 'Not authenticated' });
+      reply(ack, data, { ok: false, message: 'Not authenticated' });
       return;
     }
 
@@ -216,16 +403,19 @@ io.on('connection', (socket) => {
 
     if (!game) {
       socket.emit('error', { message: 'Room not found' });
+      reply(ack, data, { ok: false, message: 'Room not found' });
       return;
     }
 
     if (game.state !== 'waiting') {
       socket.emit('error', { message: 'Game already started' });
+      reply(ack, data, { ok: false, message: 'Game already started' });
       return;
     }
 
     if (game.players.size >= 4) {
       socket.emit('error', { message: 'Room is full' });
+      reply(ack, data, { ok: false, message: 'Room is full' });
       return;
     }
 
@@ -235,12 +425,15 @@ io.on('connection', (socket) => {
     });
 
     socket.join(roomId);
+    socket.join(`${roomId}:${socket.data.wire}`);
+    publishRoom(game);
 
     io.to(roomId).emit('player_joined', {
       playerId: player.userId,
       username: player.username,
       game: game.getState()
     });
+    reply(ack, data, { ok: true, roomId, game: game.getState() });
 
     console.log(`${player.username} joined room: ${roomId}`);
   });
@@ -267,6 +460,7 @@ io.on('connection', (socket) => {
 
     game.state = 'playing';
     game.startTime = Date.now();
+    publishRoom(game);
 
     io.to(roomId).emit('game_started', {
       game: game.getState()
@@ -282,7 +476,18 @@ io.on('connection', (socket) => {
 
     if (!game || !player) return;
 
-    game.updateSnake(player.userId, snakeData);
+    if (snakeData) parseCells(snakeData, game.boardSize());
+    const sequenced = snakeData && snakeData.seq !== undefined;
+    if (sequenced) {
+      if (!game.applySnakeDelta(player.userId, snakeData)) {
+        // Lost track of this snake, ask the client for a full body
+        socket.emit('keyframe_request', { roomId });
+        return;
+      }
+    } else {
+      // Legacy clients send the whole body every frame
+      game.updateSnake(player.userId, snakeData);
+    }
     
     const playerData = game.players.get(player.userId);
     if (playerData) {
@@ -291,7 +496,37 @@ io.on('connection', (socket) => {
 
     game.turn++;
 
-    io.to(roomId).emit('game_state', game.getState());
+    if (sequenced && !snakeData.keyframe) {
+      // Relay the delta as-is to everyone else in the room
+      game.emitSnakes('snake_delta', {
+        ...snakeData,
+        roomId,
+        playerId: player.userId,
+        score
+      }, socket);
+    } else {
+      game.emitSnakes('game_state', game.getState());
+    }
+  });
+
+  socket.on('request_keyframe', (data) => {
+    const { roomId, playerId } = data;
+    const game = games.get(roomId);
+    const snake = game && game.snakes.get(playerId);
+
+    if (!snake || snake.seq === undefined) return;
+
+    socket.emit('snake_delta', formatCells({
+      roomId,
+      playerId,
+      seq: snake.seq,
+      keyframe: true,
+      cells: snake.cells,
+      direction: snake.direction,
+      alive: snake.alive,
+      tick: snake.tick,
+      score: game.players.get(playerId)?.score
+    }, socket.data.wire, game.boardSize()));
   });
 
   socket.on('player_died', async (data) => {
@@ -315,6 +550,7 @@ io.on('connection', (socket) => {
     if (alivePlayers.length <= 1) {
       game.state = 'finished';
       game.endTime = Date.now();
+      unpublishRoom(roomId);
       
       if (alivePlayers.length === 1) {
         game.winner = alivePlayers[0].id;
@@ -368,6 +604,7 @@ io.on('connection', (socket) => {
 
     game.removePlayer(player.userId);
     socket.leave(roomId);
+    socket.leave(`${roomId}:${socket.data.wire}`);
 
     io.to(roomId).emit('player_left', {
       playerId: player.userId,
@@ -376,6 +613,9 @@ io.on('connection', (socket) => {
 
     if (game.players.size === 0) {
       games.delete(roomId);
+      unpublishRoom(roomId);
+    } else {
+      publishRoom(game);
     }
   });
 
@@ -394,6 +634,9 @@ io.on('connection', (socket) => {
 
           if (game.players.size === 0) {
             games.delete(roomId);
+            unpublishRoom(roomId);
+          } else {
+            publishRoom(game);
           }
         }
       });
@@ -0,0 +1,47 @@
+"""NetworkManager on socketio.AsyncClient, driven by an event loop thread.
+
+The pygame loop stays synchronous: emits are scheduled onto the loop,
+calls block on the returned future, and incoming events are queued from
+the loop thread into the same inbox the main loop drains with poll().
+"""
+import asyncio
+from threading import Thread
+import socketio
+import wire
+from network_manager import NetworkManager
+
+# Seconds to wait for the initial connection
+CONNECT_TIMEOUT = 10
+
+class AsyncNetworkManager(NetworkManager):
+    def create_client(self):
+        """AsyncClient plus the event loop thread it runs on"""
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = Thread(target=self.loop.run_forever, name='socketio-loop', daemon=True)
+        self.loop_thread.start()
+        return socketio.AsyncClient()
+        
+    def run(self, coroutine, timeout=None):
+        """Run a coroutine on the event loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+        
+    def connect_client(self, server_url):
+        """Open the connection, offering the binary wire format"""
+        self.run(self.sio.connect(server_url, auth={'wire': wire.BINARY}), CONNECT_TIMEOUT)
+        
+    def disconnect_client(self):
+        """Close the connection and stop the event loop"""
+        try:
+            self.run(self.sio.disconnect(), CONNECT_TIMEOUT)
+            # Let the transport tasks finish before the loop goes away
+            self.run(self.sio.wait(), CONNECT_TIMEOUT)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            
+    def emit(self, event, data):
+        """Queue an event on the loop, safe from any thread"""
+        asyncio.run_coroutine_threadsafe(self.sio.emit(event, data), self.loop)
+        
+    def send_call(self, event, data, timeout):
+        """Send an event from the game thread and block until it is acknowledged"""
+        return self.run(self.sio.call(event, data, timeout=timeout))
\ No newline at end of file
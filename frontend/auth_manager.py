@@ -1,12 +1,25 @@
 import json
 import os
 import pickle
-import requests
+import http_session
+
+# Firebase Auth REST endpoints, replaceable by a local stand-in (such as the
+# Auth emulator) for tests and benchmarks
+IDENTITY_TOOLKIT_URL = "https://identitytoolkit.googleapis.com/v1"
+SECURE_TOKEN_URL = "https://securetoken.googleapis.com/v1"
+
+# Seconds to connect and to wait for a reply, a hung endpoint fails instead of freezing the UI
+AUTH_TIMEOUT = (3.05, 10)
 
 class AuthManager:
-    def __init__(self, config_file='firebase_config.json'):
+    def __init__(self, config_file='firebase_config.json', identity_url=None, token_url=None,
+                 timeout=AUTH_TIMEOUT, retries=http_session.RETRIES, session_file='session.pkl'):
         self.current_user = None
-        self.session_file = 'session.pkl'
+        self.session_file = session_file
+        self.identity_url = identity_url or IDENTITY_TOOLKIT_URL
+        self.token_url = token_url or SECURE_TOKEN_URL
+        self.timeout = timeout
+        self.retries = retries
         
         # Load Firebase config
         try:
@@ -24,6 +37,11 @@ class AuthManager:
         # Try to load saved session
         self.load_session()
         
+    def post(self, base_url, method, payload, idempotent=True):
+        """POST to an auth endpoint over the shared session, with timeout and retries"""
+        url = f"{base_url}/{method}?key={self.api_key}"
+        return http_session.post_json(url, payload, self.timeout, self.retries, idempotent)
+        
     def register(self, email, password, username):
         """Register a new user using Firebase REST API"""
         if not self.api_key:
@@ -31,15 +49,14 @@ class AuthManager:
             
         try:
             # Create user with Firebase Authentication REST API
-            url = f"https://identitytoolkit.googleapis.com/v1/accounts:signUp?key={self.api_key}"
-            
             payload = {
                 "email": email,
                 "password": password,
                 "returnSecureToken": True
             }
             
-            response = requests.post(url, json=payload)
+            # Not retried after it may have reached the server, a repeat would fail with EMAIL_EXISTS
+            response = self.post(self.identity_url, "accounts:signUp", payload, idempotent=False)
             
             if response.status_code == 200:
                 data = response.json()
@@ -72,15 +89,13 @@ class AuthManager:
             
         try:
             # Sign in with Firebase Authentication REST API
-            url = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={self.api_key}"
-            
             payload = {
                 "email": email,
                 "password": password,
                 "returnSecureToken": True
             }
             
-            response = requests.post(url, json=payload)
+            response = self.post(self.identity_url, "accounts:signInWithPassword", payload)
             
             if response.status_code == 200:
                 data = response.json()
@@ -109,28 +124,24 @@ class AuthManager:
     def update_profile(self, id_token, display_name):
         """Update user profile"""
         try:
-            url = f"https://identitytoolkit.googleapis.com/v1/accounts:update?key={self.api_key}"
-            
             payload = {
                 "idToken": id_token,
                 "displayName": display_name,
                 "returnSecureToken": False
             }
             
-            requests.post(url, json=payload)
+            self.post(self.identity_url, "accounts:update", payload)
         except Exception as e:
             print(f"Error updating profile: {e}")
             
     def get_user_profile(self, id_token):
         """Get user profile information"""
         try:
-            url = f"https://identitytoolkit.googleapis.com/v1/accounts:lookup?key={self.api_key}"
-            
             payload = {
                 "idToken": id_token
             }
             
-            response = requests.post(url, json=payload)
+            response = self.post(self.identity_url, "accounts:lookup", payload)
             
             if response.status_code == 200:
                 data = response.json()
@@ -148,14 +159,12 @@ class AuthManager:
             return False
             
         try:
-            url = f"https://securetoken.googleapis.com/v1/token?key={self.api_key}"
-            
             payload = {
                 "grant_type": "refresh_token",
                 "refresh_token": self.current_user['refreshToken']
             }
             
-            response = requests.post(url, json=payload)
+            response = self.post(self.token_url, "token", payload)
             
             if response.status_code == 200:
                 data = response.json()
@@ -0,0 +1,185 @@
+"""Vectorized simulation stepping many independent games at once with NumPy.
+
+Mirrors the rules of Simulation/Snake: wrap-around moves, no reversing,
+growth by one per fruit, blocks and dead snakes are solid, a tail that
+retracts this tick can be chased, and a fruit spawns every
+FRUIT_INTERVAL turns on the free cell furthest from anything occupied.
+All snakes of a game move simultaneously, so two heads entering the
+same cell both die.
+"""
+import numpy as np
+
+import grid
+from fruit_placer import distance_map_numpy
+from simulation import FRUIT_INTERVAL
+
+DIRECTIONS = ('UP', 'DOWN', 'LEFT', 'RIGHT')
+DX = np.array([0, 0, -1, 1])
+DY = np.array([-1, 1, 0, 0])
+REVERSE = np.array([1, 0, 3, 2])
+
+# Codes a snake cannot move into, live snake codes are added per instance
+SOLID = np.array([code == grid.BLOCK or code & grid.DEAD != 0 for code in range(256)])
+
+class BatchSimulation:
+    def __init__(self, games, size, snakes=2, block_cells=(), seed=None):
+        if snakes > grid.MAX_SNAKES:
+            raise ValueError("Too many snakes for the occupancy grid")
+        self.games = games
+        self.size = size
+        self.num_snakes = snakes
+        self.rng = np.random.default_rng(seed)
+        
+        self.blocks = np.zeros((size, size), dtype=bool)
+        for x, y in block_cells:
+            if 0 <= x < size and 0 <= y < size:
+                self.blocks[x, y] = True
+                
+        # Entity codes as in grid.py, one board per game
+        self.board = np.zeros((games, size, size), dtype=np.uint8)
+        # Ticks until each snake cell retracts, the head holds the snake length
+        self.life = np.zeros((games, size, size), dtype=np.int32)
+        
+        self.heads = np.zeros((games, snakes, 2), dtype=np.int64)
+        self.direction = np.zeros((games, snakes), dtype=np.int64)
+        self.length = np.ones((games, snakes), dtype=np.int32)
+        self.alive = np.zeros((games, snakes), dtype=bool)
+        self.score = np.zeros((games, snakes), dtype=np.int32)
+        self.turn = np.zeros(games, dtype=np.int64)
+        
+        self.solid = SOLID.copy()
+        self.solid[grid.SNAKE:grid.SNAKE + snakes] = True
+        
+        self._game = np.arange(games)[:, None]
+        self._game3 = np.arange(games)[:, None, None]
+        
+        # Counters for throughput reporting
+        self.ticks = 0  # Game-ticks advanced, summed over all games
+        self.finished = 0  # Games that ended with every snake dead
+        
+        self.reset(np.arange(games))
+        
+    def reset(self, games):
+        """Start fresh games at the given indices with snakes on random free cells"""
+        games = np.asarray(games)
+        snakes = np.arange(self.num_snakes)
+        for g in games:
+            self.board[g] = np.where(self.blocks, grid.BLOCK, grid.EMPTY)
+            self.life[g] = 0
+            free = np.flatnonzero(self.board[g].ravel() == grid.EMPTY)
+            starts = self.rng.choice(free, size=self.num_snakes, replace=False)
+            self.heads[g, :, 0], self.heads[g, :, 1] = np.divmod(starts, self.size)
+            self.board[g].flat[starts] = grid.SNAKE + snakes
+            self.life[g].flat[starts] = 1
+            self.direction[g] = self.rng.integers(0, 4, self.num_snakes)
+        self.length[games] = 1
+        self.alive[games] = True
+        self.score[games] = 0
+        self.turn[games] = 0
+        self._spawn_fruit(games)
+        
+    def reset_finished(self):
+        """Restart every game whose snakes are all dead, returns how many"""
+        done = np.flatnonzero(~self.alive.any(axis=1))
+        if len(done):
+            self.finished += len(done)
+            self.reset(done)
+        return len(done)
+        
+    def targets(self, direction):
+        """Cells each snake would enter moving in the given directions"""
+        nx = (self.heads[..., 0] + DX[direction]) % self.size
+        ny = (self.heads[..., 1] + DY[direction]) % self.size
+        return nx, ny
+        
+    def step(self, directions=None):
+        """Advance every running game one turn, returns the snakes that died"""
+        g = self._game
+        size = self.size
+        alive = self.alive
+        active = alive.any(axis=1)
+        
+        # Requested turns, ignoring 180-degree reversals like Snake.handle
+        if directions is not None:
+            directions = np.asarray(directions)
+            self.direction = np.where(directions != REVERSE[self.direction], directions, self.direction)
+            
+        nx, ny = self.targets(self.direction)
+        target = self.board[g, nx, ny]
+        eating = alive & (target == grid.FRUIT)
+        retracting = alive & ~eating
+        
+        # A tail cell frees up this tick when its owner is not growing
+        owner = target.astype(np.int64) - grid.SNAKE
+        is_snake = (owner >= 0) & (owner < self.num_snakes)
+        owner = np.clip(owner, 0, self.num_snakes - 1)
+        tail_frees = is_snake & (self.life[g, nx, ny] == 1) & retracting[g, owner]
+        blocked = self.solid[target] & ~tail_frees
+        
+        # Heads meeting in the same cell kill both snakes
+        flat = (g * size + nx) * size + ny
+        cells, counts = np.unique(flat[alive], return_counts=True)
+        clash = alive & np.isin(flat, cells[counts > 1])
+        
+        dying = alive & (blocked | clash)
+        survive = alive & ~dying
+        eating &= survive
+        
+        # Per-cell view of which snake owns it
+        cell_owner = self.board.astype(np.int64) - grid.SNAKE
+        live_cell = (cell_owner >= 0) & (cell_owner < self.num_snakes)
+        cell_owner = np.clip(cell_owner, 0, self.num_snakes - 1)
+        
+        # Retract the tails of snakes that moved without eating
+        shrink = live_cell & (survive & ~eating)[self._game3, cell_owner]
+        self.life -= shrink
+        self.board[shrink & (self.life == 0)] = grid.EMPTY
+        
+        # Dead snakes stay on the board as solid corpses
+        corpse = live_cell & dying[self._game3, cell_owner]
+        self.board[corpse] |= grid.DEAD
+        self.life[corpse] = 0
+        
+        # Advance surviving heads
+        self.length += eating
+        self.score += 10 * eating
+        gs, ss = np.nonzero(survive)
+        hx, hy = nx[survive], ny[survive]
+        self.board[gs, hx, hy] = grid.SNAKE + ss
+        self.life[gs, hx, hy] = self.length[gs, ss]
+        self.heads[..., 0] = np.where(survive, nx, self.heads[..., 0])
+        self.heads[..., 1] = np.where(survive, ny, self.heads[..., 1])
+        self.alive = survive
+        
+        # Spawn fruit periodically in games that were still running
+        self.turn += active
+        self.ticks += int(active.sum())
+        self._spawn_fruit(np.flatnonzero(active & (self.turn % FRUIT_INTERVAL == 0)))
+        
+        return dying
+        
+    def _spawn_fruit(self, games):
+        """Place a fruit on the furthest free cell of each given game"""
+        if not len(games):
+            return
+        dist = distance_map_numpy(self.board[games] != grid.EMPTY).reshape(len(games), -1)
+        # argmax picks the smallest x, then y, among ties like Simulation
+        best = dist.argmax(axis=1)
+        has_room = dist.max(axis=1) > 0
+        self.board.reshape(self.games, -1)[games[has_room], best[has_room]] = grid.FRUIT
+
+def safe_policy(sim, turn_chance=0.1):
+    """Keep heading unless blocked or bored, then turn to a random safe direction"""
+    g = sim._game
+    blocked = np.empty(sim.direction.shape + (4,), dtype=bool)
+    for d in range(4):
+        nx, ny = sim.targets(np.full_like(sim.direction, d))
+        blocked[..., d] = sim.solid[sim.board[g, nx, ny]]
+    blocked[sim._game, np.arange(sim.num_snakes), REVERSE[sim.direction]] = True
+    
+    current_ok = ~blocked[sim._game, np.arange(sim.num_snakes), sim.direction]
+    keep = current_ok & (sim.rng.random(sim.direction.shape) >= turn_chance)
+    
+    scores = sim.rng.random(blocked.shape)
+    scores[blocked] = -1
+    return np.where(keep, sim.direction, scores.argmax(axis=-1))
\ No newline at end of file
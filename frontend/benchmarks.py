@@ -0,0 +1,547 @@
+"""Micro-benchmarks for the game's hot paths.
+
+Run from the frontend directory, e.g.:
+
+    python benchmarks.py fruit --sizes 20 50 100 200 500
+    python benchmarks.py render --lengths 10 100 1000 5000
+    python benchmarks.py sim --snakes 4 --ticks 100000
+    python benchmarks.py batch --games 4096 --snakes 4 --steps 500
+    python benchmarks.py protocol --players 4 --lengths 10 100 1000
+    python benchmarks.py players --counts 4 16 64
+    python benchmarks.py text --labels 20 --frames 600
+    python benchmarks.py auth --logins 200 --fail-rate 0.1
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import fruit_placer
+
+def random_board(size, fill, rng):
+    """Flat occupancy mask with roughly `fill` of the cells taken"""
+    return bytearray(rng.random() < fill for _ in range(size * size))
+
+def legacy_fruit_pos(occupied, size):
+    """The original O(size^4) scan, kept as the reference for tie-breaking"""
+    ret = -1, -1
+    mx = -100
+    for i in range(size):
+        for j in range(size):
+            if occupied[i * size + j]:
+                continue
+            mn = 100000000
+            for x in range(size):
+                for y in range(size):
+                    if occupied[x * size + y]:
+                        mn = min(mn, abs(x - i) + abs(y - j))
+            if mn > mx:
+                mx = mn
+                ret = i, j
+    return ret
+
+def timed(fn, *args, repeat=3):
+    """Best wall time of `repeat` runs, in milliseconds, plus the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+def bench_fruit(args):
+    """Compare fruit placement strategies across board sizes"""
+    rng = random.Random(args.seed)
+    has_numpy = fruit_placer.np is not None
+    
+    print(f"{'size':>6} {'legacy ms':>11} {'bfs ms':>9} {'numpy ms':>10}  match")
+    for size in args.sizes:
+        occupied = random_board(size, args.fill, rng)
+        
+        bfs_ms, bfs_pos = timed(fruit_placer.furthest_free_cell, occupied, size, False)
+        numpy_ms = numpy_pos = None
+        if has_numpy:
+            numpy_ms, numpy_pos = timed(fruit_placer.furthest_free_cell, occupied, size, True)
+            
+        legacy_ms = legacy_pos = None
+        if size <= args.legacy_max:
+            legacy_ms, legacy_pos = timed(legacy_fruit_pos, occupied, size, repeat=1)
+            
+        expected = legacy_pos if legacy_pos is not None else bfs_pos
+        match = bfs_pos == expected and (numpy_pos is None or numpy_pos == expected)
+        
+        def fmt(ms, width):
+            return f"{ms:>{width}.2f}" if ms is not None else f"{'-':>{width}}"
+            
+        print(f"{size:>6} {fmt(legacy_ms, 11)} {fmt(bfs_ms, 9)} {fmt(numpy_ms, 10)}  {'yes' if match else 'NO'}")
+
+def hamiltonian_cycle(size):
+    """Closed path through every cell of an even-sized board"""
+    # Snake through columns 1.. row by row, then return up column 0
+    path = []
+    for y in range(size):
+        xs = range(1, size) if y % 2 == 0 else range(size - 1, 0, -1)
+        path.extend((x, y) for x in xs)
+    path.extend((0, y) for y in range(size - 1, -1, -1))
+    return path
+
+def direction_between(a, b, size):
+    """Direction name for a single wrapped step from a to b"""
+    dx = (b[0] - a[0]) % size
+    dy = (b[1] - a[1]) % size
+    if dx == 1:
+        return 'RIGHT'
+    if dx == size - 1:
+        return 'LEFT'
+    if dy == 1:
+        return 'DOWN'
+    return 'UP'
+
+def bench_render(args):
+    """Per-tick render cost of a moving snake as its body grows"""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    import consts
+    from body import SnakeBody
+    from game_manager import GameManager
+    from snake import Snake
+    
+    size = args.size
+    consts.cell_size = args.cell_size
+    pygame.init()
+    screen = pygame.display.set_mode((size * args.cell_size, size * args.cell_size))
+    cycle = hamiltonian_cycle(size)
+    
+    print(f"{'length':>8} {'mode':>12} {'us/tick':>9} {'cells/tick':>11}")
+    for length in args.lengths:
+        if length >= len(cycle):
+            print(f"{length:>8} skipped, board {size}x{size} is too small")
+            continue
+        for mode in ('full', 'incremental'):
+            game = GameManager(size, screen, 0, 0, [])
+            snake = Snake({}, game.sim, cycle[0], (0, 240, 0), 'RIGHT')
+            snake.cells = SnakeBody(size, cycle[:length])
+            snake.length = length
+            snake.redraw()
+            game.flush()
+            
+            step = length - 1
+            painted = game.dirty.submitted
+            start = time.perf_counter()
+            for _ in range(args.ticks):
+                head = cycle[step % len(cycle)]
+                snake.direction = direction_between(head, cycle[(step + 1) % len(cycle)], size)
+                snake.next_move()
+                if mode == 'full':
+                    # What every tick cost before incremental rendering
+                    snake.redraw()
+                game.flush()
+                step += 1
+            elapsed = time.perf_counter() - start
+            
+            assert snake.alive, "benchmark snake should never collide"
+            per_tick = (game.dirty.submitted - painted) / args.ticks
+            print(f"{length:>8} {mode:>12} {elapsed / args.ticks * 1e6:>9.1f} {per_tick:>11.1f}")
+            
+    pygame.quit()
+
+def safe_direction(snake, rng, turn_chance):
+    """Keep going unless blocked or bored, never reversing into the body"""
+    sim = snake.game
+    head = snake.get_head()
+    reverse = {'UP': 'DOWN', 'DOWN': 'UP', 'LEFT': 'RIGHT', 'RIGHT': 'LEFT'}
+    options = []
+    for direction in ('UP', 'DOWN', 'LEFT', 'RIGHT'):
+        if direction == reverse[snake.direction]:
+            continue
+        pos = ((head[0] + snake.dx[direction]) % sim.size, (head[1] + snake.dy[direction]) % sim.size)
+        if not sim.is_blocked(pos):
+            options.append(direction)
+    if snake.direction in options and rng.random() > turn_chance:
+        return snake.direction
+    return rng.choice(options) if options else snake.direction
+
+def bench_sim(args):
+    """Headless simulation throughput with simple bots, no pygame involved"""
+    import consts
+    from simulation import Simulation
+    from snake import Snake
+    
+    rng = random.Random(args.seed)
+    blocks = [cell for cell in consts.block_cells if max(cell) < args.size]
+    ticks = games = 0
+    
+    start = time.perf_counter()
+    while ticks < args.ticks:
+        sim = Simulation(args.size, blocks)
+        for i in range(args.snakes):
+            while True:
+                pos = (rng.randrange(args.size), rng.randrange(args.size))
+                if sim.grid.is_empty(pos):
+                    break
+            sim.add_snake(Snake({}, sim, pos, (0, 240, 0), rng.choice(('UP', 'DOWN', 'LEFT', 'RIGHT'))))
+        sim.spawn_fruit()
+        
+        while sim.snakes and sim.turn < args.max_turns and ticks < args.ticks:
+            for snake in sim.snakes:
+                snake.direction = safe_direction(snake, rng, 0.1)
+            sim.tick()
+            ticks += 1
+        games += 1
+    elapsed = time.perf_counter() - start
+    
+    assert 'pygame' not in sys.modules, "the simulation must not import pygame"
+    print(f"{ticks} ticks over {games} games of {args.snakes} snakes on {args.size}x{args.size}")
+    print(f"{ticks / elapsed:,.0f} ticks/s ({elapsed:.2f}s, pygame not loaded)")
+
+def bench_batch(args):
+    """Vectorized batch simulation throughput in game-ticks per second"""
+    import consts
+    from batch_sim import BatchSimulation, safe_policy
+    
+    sim = BatchSimulation(args.games, args.size, args.snakes, consts.block_cells, seed=args.seed)
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        sim.step(safe_policy(sim))
+        sim.reset_finished()
+    elapsed = time.perf_counter() - start
+    
+    # NumPy runs these element-wise ops on a single core
+    print(f"{args.games} games x {args.steps} steps, {args.snakes} snakes on {args.size}x{args.size}")
+    print(f"{sim.ticks:,} game-ticks in {elapsed:.2f}s, {sim.finished} games finished")
+    print(f"{sim.ticks / elapsed:,.0f} game-ticks/s per core")
+
+def binary_payload(message):
+    """JSON text and attachments of a Socket.IO message with bytes values"""
+    attachments = []
+    
+    def strip(value):
+        if isinstance(value, (bytes, bytearray)):
+            attachments.append(value)
+            return {'_placeholder': True, 'num': len(attachments) - 1}
+        if isinstance(value, dict):
+            return {key: strip(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [strip(item) for item in value]
+        return value
+        
+    return json.dumps(strip(message)), attachments
+
+def bench_protocol(args):
+    """Downstream bytes/s and decode time per client: full game_state, JSON deltas, binary deltas"""
+    import wire
+    from body import SnakeBody
+    from delta import DeltaEncoder, DeltaDecoder
+    
+    size = args.size
+    cycle = hamiltonian_cycle(size)
+    print(f"{args.players} players at {args.rate} updates/s on {size}x{size}")
+    print(f"{'length':>8} {'format':>7} {'KB/s in':>10} {'decode ms/s':>12}")
+    
+    for length in args.lengths:
+        # Players follow the cycle at different offsets so bodies never overlap
+        bodies = []
+        for p in range(args.players):
+            offset = p * (len(cycle) // args.players)
+            bodies.append(SnakeBody(size, cycle[offset:offset + length]))
+        steps = [len(body) + p * (len(cycle) // args.players) for p, body in enumerate(bodies)]
+        encoders = [DeltaEncoder() for _ in bodies]
+        decoders = [DeltaDecoder() for _ in bodies]
+        binary_encoders = [DeltaEncoder() for _ in bodies]
+        binary_decoders = [DeltaDecoder() for _ in bodies]
+        
+        full_bytes = delta_bytes = binary_bytes = 0
+        full_time = delta_time = binary_time = 0.0
+        for _ in range(args.ticks):
+            for p, body in enumerate(bodies):
+                body.push_head(cycle[steps[p] % len(cycle)])
+                body.pop_tail()
+                steps[p] += 1
+                
+            # Today: every update triggers a full game_state to every client
+            state = {
+                'id': 'room',
+                'players': [{'id': f'p{p}', 'username': f'p{p}', 'color': [0, 240, 0], 'score': 0, 'alive': True} for p in range(args.players)],
+                'snakes': [[f'p{p}', {'cells': body.to_list(), 'direction': 'RIGHT', 'alive': True}] for p, body in enumerate(bodies)],
+                'fruits': [],
+                'state': 'playing',
+                'turn': 0
+            }
+            payload = json.dumps(state)
+            for _ in bodies:
+                full_bytes += len(payload)
+                start = time.perf_counter()
+                json.loads(payload)
+                full_time += time.perf_counter() - start
+                
+            # Deltas: each client receives the other players' updates, keyframes as game_state
+            for p, body in enumerate(bodies):
+                update = encoders[p].encode(body)
+                update.update({'direction': 'RIGHT', 'alive': True, 'roomId': 'room', 'playerId': f'p{p}', 'score': 0})
+                payload = json.dumps(state if update.get('keyframe') else update)
+                receivers = len(bodies) if update.get('keyframe') else len(bodies) - 1
+                delta_bytes += len(payload) * receivers
+                start = time.perf_counter()
+                json.loads(payload)
+                decoders[p].apply(update)
+                delta_time += (time.perf_counter() - start) * receivers
+                
+            # Binary deltas: same messages with cells as packed uint16 attachments
+            for p, body in enumerate(bodies):
+                update = binary_encoders[p].encode(body, binary=True)
+                update.update({'direction': 'RIGHT', 'alive': True, 'roomId': 'room', 'playerId': f'p{p}', 'score': 0})
+                if update.get('keyframe'):
+                    message = dict(state, snakes=[[f'p{q}', {'cells': wire.pack(other.indices()), 'direction': 'RIGHT', 'alive': True}] for q, other in enumerate(bodies)])
+                    receivers = len(bodies)
+                else:
+                    message = update
+                    receivers = len(bodies) - 1
+                text, attachments = binary_payload(message)
+                binary_bytes += (len(text) + sum(len(a) for a in attachments)) * receivers
+                start = time.perf_counter()
+                json.loads(text)
+                binary_decoders[p].apply(update)
+                binary_time += (time.perf_counter() - start) * receivers
+                
+        seconds = args.ticks / args.rate
+        clients = args.players
+        rows = (('full', full_bytes, full_time), ('delta', delta_bytes, delta_time), ('binary', binary_bytes, binary_time))
+        for name, total, spent in rows:
+            print(f"{length:>8} {name:>7} {total / clients / seconds / 1024:>10.1f} {spent / clients / seconds * 1000:>12.2f}")
+
+def legacy_player_lookup(game_state, player_data, default_color):
+    """Per-frame player lookups as update_from_network used to do them"""
+    snakes_data = dict(game_state.get('snakes', []))
+    colors = {}
+    for player_id in snakes_data:
+        if player_id == player_data.get('userId'):
+            continue
+        color = default_color
+        for player in game_state.get('players', []):
+            if player.get('id') == player_id:
+                color = tuple(player.get('color', [255, 255, 255]))
+                break
+        colors[player_id] = color
+    return colors
+
+def registry_player_lookup(game_state, registry, default_color):
+    """The same lookups through a PlayerRegistry and the indexed snapshot"""
+    colors = {}
+    for player_id in game_state['snakes_by_id']:
+        if registry.is_local(player_id):
+            continue
+        colors[player_id] = registry.color_of(player_id, default_color)
+    return colors
+
+def bench_players(args):
+    """Per-frame cost of player lookups and remote snake application vs room size"""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    import consts
+    from game_manager import GameManager
+    from player_registry import PlayerRegistry
+    
+    consts.cell_size = args.cell_size
+    pygame.init()
+    
+    print(f"{'players':>8} {'legacy us':>10} {'registry us':>12} {'frame us':>9}")
+    for count in args.counts:
+        size = max(20, count)
+        screen = pygame.display.set_mode((size * args.cell_size, size * args.cell_size))
+        players = [{'id': f'p{p}', 'username': f'p{p}', 'color': [p % 256, 240, 0], 'score': 0, 'alive': True} for p in range(count)]
+        snakes = [[f'p{p}', {'cells': [[p, y] for y in range(args.length)], 'direction': 'DOWN', 'alive': True}] for p in range(count)]
+        game_state = {'players': players, 'snakes': snakes, 'snakes_by_id': dict(snakes)}
+        player_data = {'userId': 'p0'}
+        registry = PlayerRegistry()
+        registry.local_id = 'p0'
+        registry.update(players)
+        
+        frames = args.frames
+        start = time.perf_counter()
+        for _ in range(frames):
+            legacy = legacy_player_lookup(game_state, player_data, consts.back_color)
+        legacy_us = (time.perf_counter() - start) / frames * 1e6
+        
+        start = time.perf_counter()
+        for _ in range(frames):
+            indexed = registry_player_lookup(game_state, registry, consts.back_color)
+        registry_us = (time.perf_counter() - start) / frames * 1e6
+        assert legacy == indexed
+        
+        # Whole update_from_network on a settled board, the per-frame steady state
+        game = GameManager(size, screen, 0, 0, [])
+        game.registry = registry
+        game.update_from_network(game_state)
+        start = time.perf_counter()
+        for _ in range(frames):
+            game.update_from_network(game_state)
+        frame_us = (time.perf_counter() - start) / frames * 1e6
+        
+        print(f"{count:>8} {legacy_us:>10.1f} {registry_us:>12.1f} {frame_us:>9.1f}")
+
+def bench_text(args):
+    """Label rendering per menu frame, font.render every time vs the text cache"""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from text_cache import TextCache, get_font
+    
+    pygame.init()
+    font = get_font(24)
+    labels = [f"Menu option number {i}" for i in range(args.labels)]
+    cache = TextCache()
+    
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        for label in labels:
+            font.render(label, True, (255, 255, 255))
+    direct_us = (time.perf_counter() - start) / args.frames * 1e6
+    
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        for label in labels:
+            cache.render(font, label, True, (255, 255, 255))
+    cached_us = (time.perf_counter() - start) / args.frames * 1e6
+    
+    print(f"{args.labels} labels: {direct_us:.1f} us/frame uncached, {cached_us:.1f} us/frame cached")
+    print(f"Cache stats: {cache.get_stats()}")
+
+def identity_stand_in(fail_rate, rng):
+    """Local HTTP/1.1 server answering the Identity Toolkit calls a login makes"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive, like the real endpoint
+        disable_nagle_algorithm = True  # Headers and body go out as separate writes
+        
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if rng.random() < fail_rate:
+                status, body = 503, {'error': {'message': 'UNAVAILABLE'}}
+            elif self.path.startswith('/v1/accounts:lookup'):
+                status, body = 200, {'users': [{'displayName': 'bench'}]}
+            else:
+                status, body = 200, {'localId': 'u1', 'idToken': 'id', 'refreshToken': 'refresh'}
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            
+        def log_message(self, *args):
+            pass
+            
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    return server
+
+def legacy_login(base_url, api_key, email, password):
+    """Login as before the shared session: a new connection per call, no timeout or retry"""
+    import requests
+    payload = {'email': email, 'password': password, 'returnSecureToken': True}
+    response = requests.post(f"{base_url}/accounts:signInWithPassword?key={api_key}", json=payload)
+    if response.status_code != 200:
+        return False
+    requests.post(f"{base_url}/accounts:lookup?key={api_key}", json={'idToken': response.json()['idToken']})
+    return True
+
+def bench_auth(args):
+    """Login latency against a local Identity Toolkit stand-in, per-call requests.post vs the pooled session"""
+    import tempfile
+    import threading
+    import http_session
+    from auth_manager import AuthManager
+    
+    server = identity_stand_in(args.fail_rate, random.Random(args.seed))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    
+    legacy_ok = 0
+    start = time.perf_counter()
+    for _ in range(args.logins):
+        legacy_ok += legacy_login(base_url, 'bench', 'bench@example.com', 'password123')
+    legacy_ms = (time.perf_counter() - start) / args.logins * 1000
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        auth = AuthManager(identity_url=base_url, token_url=base_url, session_file=os.path.join(tmp, 'session.pkl'))
+        auth.api_key = 'bench'
+        pooled_ok = 0
+        start = time.perf_counter()
+        for _ in range(args.logins):
+            pooled_ok += auth.login('bench@example.com', 'password123')[0]
+        pooled_ms = (time.perf_counter() - start) / args.logins * 1000
+    server.shutdown()
+    
+    print(f"{'client':>8} {'ms/login':>9} {'succeeded':>10}")
+    print(f"{'legacy':>8} {legacy_ms:>9.2f} {legacy_ok:>6}/{args.logins}")
+    print(f"{'pooled':>8} {pooled_ms:>9.2f} {pooled_ok:>6}/{args.logins}")
+    print(f"Session stats: {http_session.get_stats()}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Snake game benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+    
+    fruit = sub.add_parser('fruit', help='Fruit placement across board sizes')
+    fruit.add_argument('--sizes', type=int, nargs='+', default=[20, 50, 100, 200, 500])
+    fruit.add_argument('--fill', type=float, default=0.05, help='Fraction of occupied cells')
+    fruit.add_argument('--legacy-max', type=int, default=30, help='Largest size to run the O(n^4) scan on')
+    fruit.add_argument('--seed', type=int, default=1)
+    fruit.set_defaults(func=bench_fruit)
+    
+    render = sub.add_parser('render', help='Snake render cost per tick vs body length')
+    render.add_argument('--lengths', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    render.add_argument('--size', type=int, default=100, help='Board size (must be even)')
+    render.add_argument('--cell-size', type=int, default=4)
+    render.add_argument('--ticks', type=int, default=200)
+    render.set_defaults(func=bench_render)
+    
+    sim = sub.add_parser('sim', help='Headless simulation ticks per second')
+    sim.add_argument('--size', type=int, default=20)
+    sim.add_argument('--snakes', type=int, default=4)
+    sim.add_argument('--ticks', type=int, default=100000)
+    sim.add_argument('--max-turns', type=int, default=2000, help='Turn limit per game')
+    sim.add_argument('--seed', type=int, default=1)
+    sim.set_defaults(func=bench_sim)
+    
+    batch = sub.add_parser('batch', help='Vectorized batch simulation game-ticks per second')
+    batch.add_argument('--games', type=int, default=4096)
+    batch.add_argument('--size', type=int, default=20)
+    batch.add_argument('--snakes', type=int, default=4)
+    batch.add_argument('--steps', type=int, default=500)
+    batch.add_argument('--seed', type=int, default=1)
+    batch.set_defaults(func=bench_batch)
+    
+    protocol = sub.add_parser('protocol', help='game_update wire cost: full bodies, JSON deltas, binary deltas')
+    protocol.add_argument('--players', type=int, default=4)
+    protocol.add_argument('--lengths', type=int, nargs='+', default=[10, 100, 1000])
+    protocol.add_argument('--size', type=int, default=100, help='Board size (must be even)')
+    protocol.add_argument('--rate', type=int, default=10, help='Updates per second per player')
+    protocol.add_argument('--ticks', type=int, default=200)
+    protocol.set_defaults(func=bench_protocol)
+    
+    players = sub.add_parser('players', help='Per-frame player lookup cost vs room size')
+    players.add_argument('--counts', type=int, nargs='+', default=[4, 16, 64])
+    players.add_argument('--length', type=int, default=10, help='Body length of every remote snake')
+    players.add_argument('--cell-size', type=int, default=4)
+    players.add_argument('--frames', type=int, default=2000)
+    players.set_defaults(func=bench_players)
+    
+    text = sub.add_parser('text', help='Menu label rendering with and without the text cache')
+    text.add_argument('--labels', type=int, default=20)
+    text.add_argument('--frames', type=int, default=600)
+    text.set_defaults(func=bench_text)
+    
+    auth = sub.add_parser('auth', help='Login latency against a local Identity Toolkit stand-in')
+    auth.add_argument('--logins', type=int, default=200)
+    auth.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of stand-in replies that are 503s')
+    auth.add_argument('--seed', type=int, default=1)
+    auth.set_defaults(func=bench_auth)
+    
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
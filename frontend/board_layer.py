@@ -0,0 +1,43 @@
+import pygame
+import consts
+
+GRID_LINE_COLOR = (50, 50, 60)
+
+# Static layers already rendered, keyed by board config
+_layers = {}
+
+def static_layer(size, cell_size, block_cells):
+    """Background, grid lines and blocks for a board, rendered once per config"""
+    key = (
+        size,
+        cell_size,
+        tuple(consts.back_color),
+        tuple(consts.block_color),
+        tuple(tuple(cell) for cell in block_cells)
+    )
+    layer = _layers.get(key)
+    if layer is None:
+        layer = render_static_layer(size, cell_size, block_cells)
+        _layers[key] = layer
+    return layer
+
+def render_static_layer(size, cell_size, block_cells):
+    """Draw the static board onto a new Surface"""
+    extent = size * cell_size
+    layer = pygame.Surface((extent, extent))
+    if pygame.display.get_surface() is not None:
+        # Match the screen format so blits need no conversion
+        layer = layer.convert()
+    layer.fill(consts.back_color)
+    
+    # Every cell has a 1px border, so adjacent cells share a 2px line
+    for k in range(size):
+        for offset in (k * cell_size, (k + 1) * cell_size - 1):
+            pygame.draw.line(layer, GRID_LINE_COLOR, (offset, 0), (offset, extent - 1))
+            pygame.draw.line(layer, GRID_LINE_COLOR, (0, offset), (extent - 1, offset))
+            
+    for x, y in block_cells:
+        if 0 <= x < size and 0 <= y < size:
+            layer.fill(consts.block_color, (x * cell_size + 1, y * cell_size + 1, cell_size - 2, cell_size - 2))
+            
+    return layer
\ No newline at end of file
@@ -0,0 +1,97 @@
+from array import array
+
+class SnakeBody:
+    """Snake cells from tail to head, kept in a ring buffer of packed cell indices"""
+    __slots__ = ('size', 'ring', 'start', 'count', 'members', 'pushed', 'popped')
+    
+    def __init__(self, size, cells=(), capacity=16):
+        self.size = size
+        # uint16 indices cover boards up to 256x256, larger boards need uint32
+        typecode = 'H' if size * size <= 0x10000 else 'I'
+        self.ring = array(typecode, [0]) * capacity
+        self.start = 0  # Ring slot of the tail
+        self.count = 0
+        # Per-cell count of body segments, for O(1) membership
+        self.members = bytearray(size * size)
+        # Lifetime totals, so deltas between two points in time are cheap
+        self.pushed = 0
+        self.popped = 0
+        for pos in cells:
+            self.push_head(pos)
+            
+    def __len__(self):
+        return self.count
+        
+    def __iter__(self):
+        """Positions from tail to head"""
+        ring = self.ring
+        capacity = len(ring)
+        size = self.size
+        for k in range(self.count):
+            yield divmod(ring[(self.start + k) % capacity], size)
+            
+    def __getitem__(self, k):
+        """Position by order from the tail, negative indices count from the head"""
+        if k < 0:
+            k += self.count
+        if not 0 <= k < self.count:
+            raise IndexError("snake body index out of range")
+        return divmod(self.ring[(self.start + k) % len(self.ring)], self.size)
+        
+    def __contains__(self, pos):
+        x, y = pos
+        if not (0 <= x < self.size and 0 <= y < self.size):
+            return False
+        return self.members[x * self.size + y] != 0
+        
+    def head(self):
+        """Newest segment"""
+        return self[-1]
+        
+    def tail(self):
+        """Oldest segment"""
+        return self[0]
+        
+    def push_head(self, pos):
+        """Append a new head segment"""
+        if self.count == len(self.ring):
+            self._grow()
+        index = pos[0] * self.size + pos[1]
+        self.ring[(self.start + self.count) % len(self.ring)] = index
+        self.count += 1
+        self.pushed += 1
+        self.members[index] += 1
+        
+    def pop_tail(self):
+        """Remove and return the tail segment"""
+        if not self.count:
+            raise IndexError("pop from empty snake body")
+        index = self.ring[self.start]
+        self.start = (self.start + 1) % len(self.ring)
+        self.count -= 1
+        self.popped += 1
+        self.members[index] -= 1
+        return divmod(index, self.size)
+        
+    def _grow(self):
+        """Double the ring, unwrapping it so the tail sits at slot 0"""
+        ordered = self.indices()
+        self.ring = ordered + array(ordered.typecode, [0]) * max(len(ordered), 1)
+        self.start = 0
+        
+    def indices(self):
+        """Packed cell indices (x * size + y) from tail to head"""
+        end = self.start + self.count
+        if end <= len(self.ring):
+            return self.ring[self.start:end]
+        return self.ring[self.start:] + self.ring[:end - len(self.ring)]
+        
+    def tobytes(self):
+        """Packed indices as raw bytes, ready to go over the wire"""
+        return self.indices().tobytes()
+        
+    def to_list(self, newest=None):
+        """JSON friendly [[x, y], ...] list from tail to head, optionally only the newest cells"""
+        if newest is None:
+            return [list(pos) for pos in self]
+        return [list(self[k]) for k in range(self.count - newest, self.count)]
\ No newline at end of file
@@ -2,23 +2,14 @@ import pygame
 import consts
 
 class Cell:
-    def __init__(self, surface, sx, sy, color=None):
+    def __init__(self, surface, sx, sy, color=None, dirty=None):
         self.sx = sx
         self.sy = sy
         self.size = consts.cell_size
         self.surface = surface
+        self.dirty = dirty  # Frame-level DirtyRects collector, if any
+        # Grid lines and the initial fill come from the static board layer
         self.color = color if color else consts.back_color
-        
-        # Draw cell border (grid lines)
-        pygame.draw.rect(
-            surface, 
-            (50, 50, 60),  # Grid line color
-            (sx, sy, consts.cell_size, consts.cell_size), 
-            1
-        )
-        
-        # Fill cell with initial color
-        self.set_color(self.color)
     
     def set_color(self, color):
         """Update cell color"""
@@ -31,5 +22,37 @@ class Cell:
             (self.sx + 1, self.sy + 1, self.size - 2, self.size - 2)
         )
         
-        # Update only this cell's area for better performance
-        pygame.display.update(pygame.Rect(self.sx, self.sy, self.size, self.size))
\ No newline at end of file
+        self.mark_dirty()
+        
+    def draw_partial(self, color, fraction, dx, dy):
+        """Fill part of the cell, growing from the edge entered when moving by (dx, dy)"""
+        inner = self.size - 2
+        extent = int(inner * fraction)
+        if extent <= 0:
+            return
+        x, y, w, h = self.sx + 1, self.sy + 1, inner, inner
+        if dx:
+            w = extent
+            if dx < 0:
+                x += inner - extent
+        else:
+            h = extent
+            if dy < 0:
+                y += inner - extent
+        pygame.draw.rect(self.surface, color, (x, y, w, h))
+        self.mark_dirty()
+        
+    def restore(self, layer, origin, color):
+        """Show the static board layer under this cell again"""
+        self.color = color
+        area = (self.sx - origin[0], self.sy - origin[1], self.size, self.size)
+        self.surface.blit(layer, (self.sx, self.sy), area)
+        self.mark_dirty()
+        
+    def mark_dirty(self):
+        """Update only this cell's area, batched per frame when possible"""
+        rect = (self.sx, self.sy, self.size, self.size)
+        if self.dirty is not None:
+            self.dirty.add(rect)
+        else:
+            pygame.display.update(pygame.Rect(rect))
\ No newline at end of file
@@ -63,6 +63,11 @@ snakes = data['snakes']
 sx = data['sx']
 sy = data['sy']
 server_url = data.get('server_url', 'http://localhost:3000')
+tick_rate = data.get('tick_rate', 10)  # Simulation steps per second
+fps = data.get('fps', 60)  # Frame cap for input polling and drawing
+interp_delay = data.get('interp_delay', 0.1)  # Seconds remote snakes are drawn behind
+identity_url = data.get('identity_url')  # Auth endpoint bases, None for Firebase's own
+token_url = data.get('token_url')
 
 # UI Colors
 ui_primary = (100, 150, 255)
@@ -0,0 +1,94 @@
+"""Sequenced delta encoding of snake bodies for game_update messages.
+
+Each update carries a sequence number and either a keyframe with the
+full body or the cells added at the head plus how many left the tail.
+A receiver that sees a sequence gap drops deltas until a keyframe
+arrives and asks the sender for one, once per gap and again only if no
+keyframe came within RESYNC_TIMEOUT.
+
+Cells travel either as JSON [x, y] pairs or, when binary was negotiated,
+as packed uint16 cell indices (see wire.py).
+"""
+from collections import deque
+import wire
+
+# Send a full body every this many updates even without a resync request
+KEYFRAME_INTERVAL = 20
+
+# Seconds to wait for a requested keyframe before asking again
+RESYNC_TIMEOUT = 1.0
+
+class DeltaEncoder:
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self.last_pushed = 0
+        self.last_popped = 0
+        self.keyframe_due = True
+        
+    def request_keyframe(self):
+        """Make the next update a keyframe, e.g. after the server lost track"""
+        self.keyframe_due = True
+        
+    def encode(self, body, binary=False):
+        """Next update for a SnakeBody, cells as [x, y] pairs or packed bytes"""
+        self.seq += 1
+        added = body.pushed - self.last_pushed
+        dropped = body.popped - self.last_popped
+        
+        if self.keyframe_due or self.seq % self.keyframe_interval == 0 or added > len(body):
+            cells = wire.pack(body.indices()) if binary else body.to_list()
+            update = {'seq': self.seq, 'keyframe': True, 'cells': cells}
+            self.keyframe_due = False
+        else:
+            if binary:
+                indices = body.indices()
+                add = wire.pack(indices[len(indices) - added:])
+            else:
+                add = body.to_list(added)
+            update = {'seq': self.seq, 'add': add, 'drop': dropped}
+            
+        self.last_pushed = body.pushed
+        self.last_popped = body.popped
+        return update
+
+class DeltaDecoder:
+    def __init__(self):
+        self.seq = None
+        self.cells = deque()
+        self.packed = False  # Cells are flat indices rather than [x, y] pairs
+        self.resync_at = None  # When a keyframe was last asked for, None once in sync
+        
+    def request_resync(self, now, timeout=RESYNC_TIMEOUT):
+        """Whether to ask for a keyframe now: once per gap, then again after timeout"""
+        if self.resync_at is not None and now - self.resync_at < timeout:
+            return False
+        self.resync_at = now
+        return True
+        
+    def apply(self, update):
+        """Apply an update, returns False when a gap means a keyframe is needed"""
+        seq = update.get('seq')
+        if update.get('keyframe'):
+            cells = update.get('cells', [])
+            self.packed = isinstance(cells, (bytes, bytearray))
+            self.cells = deque(wire.unpack(cells) if self.packed else cells)
+            self.seq = seq
+            self.resync_at = None
+            return True
+            
+        if self.seq is None or seq > self.seq + 1:
+            # Missed an update (or never had a keyframe), wait for a resync
+            self.seq = None
+            return False
+        if seq <= self.seq:
+            # Duplicate or reordered update we already covered
+            return True
+            
+        cells = self.cells
+        for _ in range(min(update.get('drop', 0), len(cells))):
+            cells.popleft()
+        add = update.get('add', [])
+        cells.extend(wire.unpack(add) if isinstance(add, (bytes, bytearray)) else add)
+        self.seq = seq
+        return True
\ No newline at end of file
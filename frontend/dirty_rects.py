@@ -0,0 +1,83 @@
+import pygame
+
+def merge_rects(rects):
+    """Merge duplicate, overlapping and edge-adjacent rects with matching extents"""
+    # Horizontal runs: rects sharing a row band that touch or overlap
+    rows = {}
+    for x, y, w, h in set(rects):
+        rows.setdefault((y, h), []).append((x, x + w))
+    spans = []
+    for (y, h), runs in rows.items():
+        runs.sort()
+        start, end = runs[0]
+        for left, right in runs[1:]:
+            if left <= end:
+                end = max(end, right)
+            else:
+                spans.append((start, y, end - start, h))
+                start, end = left, right
+        spans.append((start, y, end - start, h))
+        
+    # Vertical runs: merged spans sharing a column band
+    columns = {}
+    for x, y, w, h in spans:
+        columns.setdefault((x, w), []).append((y, y + h))
+    merged = []
+    for (x, w), runs in columns.items():
+        runs.sort()
+        start, end = runs[0]
+        for top, bottom in runs[1:]:
+            if top <= end:
+                end = max(end, bottom)
+            else:
+                merged.append(pygame.Rect(x, start, w, end - start))
+                start, end = top, bottom
+        merged.append(pygame.Rect(x, start, w, end - start))
+        
+    # Drop anything already covered by a bigger rect
+    merged.sort(key=lambda r: r.w * r.h, reverse=True)
+    result = []
+    for rect in merged:
+        if not any(other.contains(rect) for other in result):
+            result.append(rect)
+    return result
+
+class DirtyRects:
+    """Collects screen areas changed during a frame and flushes them in one display update"""
+    
+    def __init__(self):
+        self.rects = []
+        self.submitted = 0  # Rects handed to add() since creation
+        self.flushed = 0  # Rects passed to pygame.display.update after merging
+        self.flushes = 0
+        
+    def add(self, rect):
+        """Mark an area of the screen as changed"""
+        self.rects.append(tuple(rect))
+        self.submitted += 1
+        
+    def flush(self):
+        """Push all changed areas to the display with a single update call"""
+        if not self.rects:
+            return 0
+            
+        merged = merge_rects(self.rects)
+        self.rects = []
+        pygame.display.update(merged)
+        
+        self.flushed += len(merged)
+        self.flushes += 1
+        return len(merged)
+        
+    def clear(self):
+        """Forget pending areas, e.g. when the whole screen is flipped anyway"""
+        self.rects = []
+        
+    def get_stats(self):
+        """Counters for rects submitted vs actually flushed"""
+        return {
+            'submitted': self.submitted,
+            'flushed': self.flushed,
+            'flushes': self.flushes,
+            'pending': len(self.rects)
+        }
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""Single-producer/single-consumer queue of network events for the main loop.
+
+The Socket.IO thread only appends; the pygame thread drains once per frame
+within a time budget and runs the handlers itself, so every event is seen
+in order and no state is written from two threads. deque.append and
+deque.popleft are atomic, which is all the synchronisation one producer and
+one consumer need.
+"""
+from collections import deque
+import time
+
+# Queued events at most, beyond that snake deltas are dropped
+INBOX_CAPACITY = 256
+
+# Events whose latest copy replaces every earlier one still queued
+COALESCED = frozenset(['game_state'])
+
+# Events safe to drop under overload; on_drop tells the owner so it can ask
+# for one keyframe per player instead of tripping over each gap.
+# Coalesced events are never dropped, the newest copy must survive.
+DROPPABLE = frozenset(['snake_delta'])
+
+class EventInbox:
+    def __init__(self, capacity=INBOX_CAPACITY, on_drop=None):
+        self.queue = deque()
+        self.capacity = capacity
+        self.on_drop = on_drop  # Called as on_drop(event, data) on the producer thread
+        self.pending = []  # Taken from the queue but left over by the last budget
+        self.stats = {
+            'posted': 0,
+            'delivered': 0,
+            'coalesced': 0,
+            'dropped': 0,
+            'deferred': 0
+        }
+        
+    def post(self, event, data):
+        """Producer side: queue an event, returns False when it was dropped"""
+        if len(self.queue) >= self.capacity and event in DROPPABLE:
+            self.stats['dropped'] += 1
+            if self.on_drop:
+                self.on_drop(event, data)
+            return False
+        self.queue.append((event, data))
+        self.stats['posted'] += 1
+        return True
+        
+    def drain(self, handle, budget):
+        """Consumer side: run handle(event, data) for queued events for up to budget seconds"""
+        deadline = time.perf_counter() + budget
+        batch = self.pending
+        queue = self.queue
+        for _ in range(len(queue)):
+            batch.append(queue.popleft())
+            
+        # Only the newest copy of a coalesced event in this batch is applied
+        latest = {}
+        for index, (event, _) in enumerate(batch):
+            if event in COALESCED:
+                latest[event] = index
+                
+        handled = 0
+        for index, (event, data) in enumerate(batch):
+            if event in COALESCED and latest[event] != index:
+                self.stats['coalesced'] += 1
+                continue
+            handle(event, data)
+            handled += 1
+            # Always make progress, then stop once the frame's budget is spent
+            if time.perf_counter() >= deadline and index + 1 < len(batch):
+                self.pending = batch[index + 1:]
+                self.stats['deferred'] += len(self.pending)
+                break
+        else:
+            self.pending = []
+        self.stats['delivered'] += handled
+        return handled
+        
+    def __len__(self):
+        return len(self.queue) + len(self.pending)
+        
+    def get_stats(self):
+        """Counts of events posted, delivered, coalesced, dropped and deferred"""
+        return dict(self.stats, queued=len(self))
\ No newline at end of file
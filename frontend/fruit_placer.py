@@ -0,0 +1,84 @@
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the BFS path needs nothing extra
+    np = None
+
+NO_CELL = (-1, -1)
+
+# Boards at least this wide use the NumPy transform when it is available
+NUMPY_MIN_SIZE = 32
+
+def distance_map(occupied, size):
+    """Manhattan distance from every cell to the nearest occupied cell (multi-source BFS)"""
+    count = size * size
+    far = 4 * size + 1  # Larger than any real distance on the board
+    dist = [far] * count
+    
+    queue = deque()
+    for index in range(count):
+        if occupied[index]:
+            dist[index] = 0
+            queue.append(index)
+            
+    # The board has no walls for distance purposes, so BFS over the
+    # 4-neighbourhood yields exact Manhattan distances
+    while queue:
+        index = queue.popleft()
+        d = dist[index] + 1
+        x, y = divmod(index, size)
+        if x > 0 and dist[index - size] > d:
+            dist[index - size] = d
+            queue.append(index - size)
+        if x < size - 1 and dist[index + size] > d:
+            dist[index + size] = d
+            queue.append(index + size)
+        if y > 0 and dist[index - 1] > d:
+            dist[index - 1] = d
+            queue.append(index - 1)
+        if y < size - 1 and dist[index + 1] > d:
+            dist[index + 1] = d
+            queue.append(index + 1)
+            
+    return dist
+
+def distance_map_numpy(occupied):
+    """Manhattan distance transform of an (..., size, size) boolean array"""
+    size = occupied.shape[-1]
+    far = 4 * size + 1
+    dist = np.where(occupied, 0, far).astype(np.int32)
+    
+    # L1 distance is separable: two sweeps along each axis are exact
+    for axis in (-1, -2):
+        view = np.moveaxis(dist, axis, 0)
+        for k in range(1, size):
+            np.minimum(view[k], view[k - 1] + 1, out=view[k])
+        for k in range(size - 2, -1, -1):
+            np.minimum(view[k], view[k + 1] + 1, out=view[k])
+            
+    return dist
+
+def furthest_free_cell(occupied, size, use_numpy=None):
+    """Free cell furthest from any occupied cell, or NO_CELL if the board is full.
+    
+    `occupied` is a flat sequence indexed by x * size + y. Ties go to the
+    smallest x, then the smallest y, matching the original row-by-row scan.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None and size >= NUMPY_MIN_SIZE
+        
+    if use_numpy:
+        mask = np.frombuffer(bytes(occupied), dtype=np.uint8).reshape(size, size)
+        dist = distance_map_numpy(mask != 0).ravel()
+        best = int(dist.max())
+        index = int(dist.argmax())
+    else:
+        dist = distance_map(occupied, size)
+        best = max(dist)
+        index = dist.index(best)
+        
+    # Occupied cells sit at distance 0, so a zero maximum means no free cell
+    if best == 0:
+        return NO_CELL
+    return divmod(index, size)
\ No newline at end of file
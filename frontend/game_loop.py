@@ -0,0 +1,66 @@
+"""Fixed-timestep accumulator that decouples simulation ticks from frames.
+
+Each frame reports how much real time passed; the accumulator turns that
+into whole simulation ticks at a fixed rate and keeps the remainder, which
+renderers use to interpolate between the last tick and the next one.
+"""
+import time
+
+# Ticks simulated in one frame at most, anything beyond is dropped
+MAX_TICKS_PER_FRAME = 5
+
+class FixedTimestep:
+    def __init__(self, tick_rate, max_ticks=MAX_TICKS_PER_FRAME, clock=time.perf_counter):
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        self.max_ticks = max_ticks
+        self.clock = clock
+        self.last = None
+        self.accumulator = 0.0
+        
+        # Counts for the running one second window, rates for the last full one
+        self.window_start = None
+        self.windows = 0
+        self.counts = {'ticks': 0, 'frames': 0, 'dropped': 0}
+        self.rates = {'ticks': 0.0, 'frames': 0.0, 'dropped': 0.0}
+        
+    def reset(self):
+        """Start timing afresh, e.g. when a game starts"""
+        self.last = None
+        self.accumulator = 0.0
+        
+    def advance(self):
+        """Record a frame and return how many ticks to simulate for it"""
+        now = self.clock()
+        if self.last is None:
+            self.last = now
+        if self.window_start is None:
+            self.window_start = now
+        self.accumulator += now - self.last
+        self.last = now
+        
+        ticks = int(self.accumulator / self.dt)
+        self.accumulator -= ticks * self.dt
+        if ticks > self.max_ticks:
+            # Far behind after a stall, skip ahead instead of spiralling
+            self.counts['dropped'] += ticks - self.max_ticks
+            ticks = self.max_ticks
+            
+        self.counts['ticks'] += ticks
+        self.counts['frames'] += 1
+        elapsed = now - self.window_start
+        if elapsed >= 1.0:
+            self.rates = {name: count / elapsed for name, count in self.counts.items()}
+            self.counts = dict.fromkeys(self.counts, 0)
+            self.window_start = now
+            self.windows += 1
+        return ticks
+        
+    @property
+    def alpha(self):
+        """Fraction of the next tick already elapsed, in [0, 1)"""
+        return min(self.accumulator / self.dt, 1.0)
+        
+    def get_stats(self):
+        """Sim ticks, frames and dropped ticks per second over the last second"""
+        return dict(self.rates, tick_rate=self.tick_rate)
\ No newline at end of file
@@ -1,41 +1,126 @@
+import time
 import consts
+from board_layer import static_layer
 from cell import Cell
-import random
+from dirty_rects import DirtyRects
+import grid
+from body import SnakeBody
+from prediction import PredictionBuffer
+from interpolation import SnapshotBuffer
+from player_registry import PlayerRegistry
+from simulation import Simulation
+from text_cache import get_font, shared_cache
 
 class GameManager:
+    """Renders a Simulation to the screen and feeds it network state"""
     def __init__(self, size, screen, sx, sy, block_cells, network_manager=None):
-        self.killed_cells = []
         self.screen = screen
         self.size = size
         self.cells = []
         self.sx = sx
         self.sy = sy
-        self.snakes = list()
         self.remote_snakes = {}  # Store remote player snakes
-        self.local_snake = None
-        self.turn = 0
         self.network_manager = network_manager
-        self.game_over = False
+        # Player colors and ids, kept current by the network layer when there is one
+        self.registry = network_manager.registry if network_manager else PlayerRegistry()
+        
+        # Rules live in the headless simulation, this class only renders it
+        self.sim = Simulation(size, verbose=True)
+        self.palette = {
+            grid.EMPTY: consts.back_color,
+            grid.BLOCK: consts.block_color,
+            grid.FRUIT: consts.fruit_color
+        }
+        self.remote_codes = {}  # player id -> snake code
+        self.drawn_bodies = {}  # player id -> remote body as last drawn, tail first
+        self.drawn_sources = {}  # player id -> body object those cells were drawn from
+        self.blocked_cells = {}  # player id -> body cells something else holds, painted once free
+        self.remote_owner = {}  # cell -> player id whose drawn body covers it
+        self.motion_cell = None  # Cell holding the interpolated head, if any
+        self.prediction = PredictionBuffer()  # Local moves not yet checked by the server
+        self.snapshots = SnapshotBuffer(consts.tick_rate, consts.interp_delay)  # Remote bodies over time
+        
+        # Changed screen areas, pushed to the display once per frame
+        self.dirty = DirtyRects()
+        
+        # Grid lines and blocks never change, draw them with one cached blit
+        self.layer = static_layer(size, consts.cell_size, block_cells)
+        screen.blit(self.layer, (sx, sy))
+        self.dirty.add((sx, sy, self.layer.get_width(), self.layer.get_height()))
         
         # Initialize grid
         for i in range(self.size):
             tmp = []
             for j in range(self.size):
-                tmp.append(Cell(screen, sx + i * consts.cell_size, sy + j * consts.cell_size))
+                tmp.append(Cell(screen, sx + i * consts.cell_size, sy + j * consts.cell_size, dirty=self.dirty))
             self.cells.append(tmp)
             
-        # Setup blocks
+        # Setup blocks, the layer already shows them
         for cell in block_cells:
-            self.get_cell(cell).set_color(consts.block_color)
-       
+            self.sim.set_cell(cell, grid.BLOCK)
+        self.sim.on_cell_changed = self.render_cell
+            
+    @property
+    def grid(self):
+        return self.sim.grid
+        
+    @property
+    def snakes(self):
+        return self.sim.snakes
+        
+    @property
+    def local_snake(self):
+        return self.sim.local_snake
+        
+    @property
+    def turn(self):
+        return self.sim.turn
+        
+    @property
+    def game_over(self):
+        return self.sim.game_over
+        
     def add_snake(self, snake):
         """Add a snake to the game"""
-        self.snakes.append(snake)
+        self.sim.add_snake(snake)
         
     def add_local_snake(self, snake):
         """Set the local player's snake"""
-        self.local_snake = snake
-        self.snakes.append(snake)
+        self.sim.add_local_snake(snake)
+        
+    def color_of(self, code):
+        """Screen color for a grid code"""
+        color = self.palette.get(code)
+        if color is None:
+            color = self.sim.colors[code & ~grid.DEAD]
+            if code & grid.DEAD:
+                # Darken the color to show a dead snake
+                color = tuple(c // 2 for c in color)
+            self.palette[code] = color
+        return color
+        
+    def set_snake_color(self, code, color):
+        """Change the color a snake code renders in"""
+        color = tuple(color)
+        if self.sim.colors.get(code) != color:
+            self.sim.colors[code] = color
+            self.palette.pop(code, None)
+            self.palette.pop(code | grid.DEAD, None)
+            
+    def render_cell(self, pos):
+        """Paint a cell from the grid contents"""
+        code = self.sim.grid.get(pos)
+        cell = self.cells[pos[0]][pos[1]]
+        if code == grid.EMPTY or code == grid.BLOCK:
+            # Static content, composite the cached layer back in
+            cell.restore(self.layer, (self.sx, self.sy), self.color_of(code))
+        else:
+            cell.set_color(self.color_of(code))
+            
+        owner = self.remote_owner.get(pos)
+        if owner is not None and code != self.remote_codes.get(owner):
+            # Something took over a remote snake's cell, paint it back once free
+            self.blocked_cells[owner].add(pos)
         
     def get_cell(self, pos):
         """Get cell at position"""
@@ -44,112 +129,203 @@ class GameManager:
         except:
             return None
             
-    def kill2(self, k):
-        """Mark cells where snake died"""
-        for p in k.cells:
-            self.killed_cells.append(p)
-            
-    def kill(self, killed_snake):
-        """Remove snake from game"""
-        if killed_snake in self.snakes:
-            self.snakes.remove(killed_snake)
-            
-        # Check if local player died
-        if killed_snake == self.local_snake:
-            self.game_over = True
-            print("Local player died!")
-            
     def get_next_fruit_pos(self):
         """Calculate optimal fruit position (furthest from all snakes)"""
-        ret = -1, -1
-        mx = -100
-        
-        for i in range(0, self.size):
-            for j in range(0, self.size):
-                # Skip if cell is occupied
-                cell_color = self.get_cell((i, j)).color
-                if cell_color != consts.back_color:
-                    continue
-                    
-                mn = 100000000
-                for x in range(0, self.size):
-                    for y in range(0, self.size):
-                        if self.get_cell((x, y)).color != consts.back_color:
-                            mn = min(mn, int(abs(x-i) + abs(y-j)))
-                            
-                if mn > mx:
-                    mx = mn
-                    ret = i, j
-                    
-        return ret
+        return self.sim.get_next_fruit_pos()
         
     def spawn_fruit(self):
         """Spawn a new fruit"""
-        coordinate = self.get_next_fruit_pos()
-        if coordinate != (-1, -1):
-            self.get_cell(coordinate).set_color(consts.fruit_color)
-            print(f"Spawned fruit at {coordinate}")
-            
-    def update_from_network(self, game_state):
-        """Update game state from network"""
+        self.sim.spawn_fruit()
+        
+    def update_from_network(self, game_state, now=None):
+        """Update game state from network, drawing remote snakes as of now - delay"""
         if not game_state:
             return
-            
+        now = time.monotonic() if now is None else now
+        
         # Update remote snakes
-        snakes_data = dict(game_state.get('snakes', []))
+        snakes_data = game_state.get('snakes_by_id')
+        if snakes_data is None:
+            snakes_data = dict(game_state.get('snakes', []))
+        registry = self.registry
+        if not registry and game_state.get('players'):
+            # No membership events seen, seed the registry from the state once
+            registry.update(game_state['players'])
         
         # Clear old remote snake visuals
-        for player_id, old_snake_data in self.remote_snakes.items():
+        for player_id in list(self.remote_snakes):
             if player_id not in snakes_data:
                 # This player left, clear their cells
-                old_cells = old_snake_data.get('cells', [])
-                for cell in old_cells:
-                    if isinstance(cell, (list, tuple)) and len(cell) == 2:
-                        self.get_cell(tuple(cell)).set_color(consts.back_color)
+                code = self.remote_code(player_id)
+                for cell in self.drawn_bodies.pop(player_id, ()):
+                    if self.remote_owner.get(cell) == player_id:
+                        del self.remote_owner[cell]
+                    self.paint_remote(cell, code, grid.EMPTY)
+                self.drawn_sources.pop(player_id, None)
+                self.blocked_cells.pop(player_id, None)
+                self.snapshots.remove(player_id)
+                del self.remote_snakes[player_id]
         
         for player_id, snake_data in snakes_data.items():
-            # Skip local player
-            if self.local_snake:
-                local_player_id = self.network_manager.get_player_data().get('userId') if self.network_manager else None
-                if player_id == local_player_id:
-                    continue
+            # Skip local player, its server copy only serves to check our prediction
+            if self.local_snake and registry.is_local(player_id):
+                self.reconcile(snake_data)
+                continue
             
             # Update remote snake
             self.remote_snakes[player_id] = snake_data
+            
+            # Sequenced snakes are buffered per tick and drawn interpolated
+            tick = snake_data.get('tick')
+            latest = self.snapshots.latest_tick(player_id)
+            if tick is not None and (latest is None or tick > latest):
+                cells = list(self.remote_cells(snake_data))
+                self.snapshots.push(player_id, tick, cells, snake_data.get('received_at', now))
                 
         # Draw remote snakes
         for player_id, snake_data in self.remote_snakes.items():
-            cells = snake_data.get('cells', [])
             alive = snake_data.get('alive', True)
             
             if alive:
-                # Get color from player data
-                players = game_state.get('players', [])
-                color = consts.back_color
-                for player in players:
-                    if player.get('id') == player_id:
-                        color = tuple(player.get('color', [255, 255, 255]))
-                        break
+                code = self.remote_code(player_id)
+                self.set_snake_color(code, registry.color_of(player_id, consts.back_color))
                 
                 # Draw snake cells
-                for cell in cells:
-                    if isinstance(cell, (list, tuple)) and len(cell) == 2:
-                        self.get_cell(tuple(cell)).set_color(color)
-                        
-    def update(self):
-        """Update game state"""
-        if self.game_over:
+                cells = self.snapshots.sample(player_id, now)
+                source = cells if cells is not None else snake_data.get('cells')
+                if source is not self.drawn_sources.get(player_id):
+                    if cells is None:
+                        cells = self.remote_cells(snake_data)
+                    self.draw_remote(player_id, code, cells)
+                    self.drawn_sources[player_id] = source
+                if self.blocked_cells.get(player_id):
+                    self.retry_blocked(player_id, code)
+                    
+    def draw_remote(self, player_id, code, cells):
+        """Paint only the cells a remote snake gained or lost since it was last drawn"""
+        body = cells if isinstance(cells, list) else list(cells)
+        added, removed = body_changes(self.drawn_bodies.get(player_id, []), body)
+        owner = self.remote_owner
+        blocked = self.blocked_cells.setdefault(player_id, set())
+        for cell in removed:
+            if owner.get(cell) == player_id:
+                del owner[cell]
+            blocked.discard(cell)
+            self.paint_remote(cell, code, grid.EMPTY)
+        for cell in added:
+            owner[cell] = player_id
+            if not self.paint_remote(cell, code, code):
+                blocked.add(cell)
+        self.drawn_bodies[player_id] = body
+        
+    def retry_blocked(self, player_id, code):
+        """Paint body cells that were held by something solid, keeping the ones still held"""
+        blocked = self.blocked_cells[player_id]
+        self.blocked_cells[player_id] = {cell for cell in blocked if not self.paint_remote(cell, code, code)}
+                    
+    def reconcile(self, snake_data):
+        """Check the server's copy of our snake, rewinding and replaying on a mismatch"""
+        snake = self.local_snake
+        tick = snake_data.get('tick')
+        if tick is None or tick <= self.prediction.confirmed or not snake.alive:
+            return
+            
+        predicted = self.prediction.get(tick)
+        if predicted is None:
+            # Older than the history, or from before a restart
+            self.prediction.stats['expired'] += 1
+            self.prediction.confirmed = tick
             return
             
-        # Update local snake
-        if self.local_snake and self.local_snake.alive:
-            self.local_snake.next_move()
+        cells = list(self.remote_cells(snake_data))
+        if cells and cells[-1] == predicted.head and len(cells) == predicted.length:
+            self.prediction.stats['confirmed'] += 1
+            self.prediction.confirm(tick)
+            return
             
-        # Spawn fruit periodically
-        self.turn += 1
-        if self.turn % 10 == 0:
-            self.spawn_fruit()
+        # Rewind to the server's body and replay the inputs made since
+        replay = self.prediction.after(tick)
+        self.prediction.stats['rewinds'] += 1
+        self.prediction.stats['replayed'] += len(replay)
+        self.prediction.clear()
+        self.prediction.confirmed = tick
+        
+        for pos in snake.cells:
+            if self.grid.get(pos) == snake.code:
+                self.sim.set_cell(pos, grid.EMPTY)
+        snake.cells = SnakeBody(self.size, cells or [predicted.head])
+        snake.length = max(len(snake.cells), 1)
+        snake.redraw()
+        
+        direction = snake.direction
+        for entry in replay:
+            snake.direction = entry.direction
+            snake.next_move()
+            if not snake.alive:
+                return
+            self.prediction.record(entry.tick, entry.direction, snake.get_head(), snake.length)
+        snake.direction = direction
+        # Growth from fruit eaten the first time round is kept
+        if replay:
+            snake.length = max(snake.length, replay[-1].length)
             
+    def remote_cells(self, snake_data):
+        """Positions of a remote snake, from [x, y] pairs or packed cell indices"""
+        cells = snake_data.get('cells', [])
+        if snake_data.get('packed'):
+            position = self.grid.position
+            for index in cells:
+                yield position(index)
+            return
+        for cell in cells:
+            if isinstance(cell, (list, tuple)) and len(cell) == 2:
+                yield tuple(cell)
+                
+    def paint_remote(self, pos, owner, code):
+        """Write a remote snake cell without clobbering the local collision index"""
+        if not self.grid.in_bounds(pos):
+            return False
+        current = self.grid.get(pos)
+        if current == code:
+            return True
+        if self.sim.solid[current] or (code == grid.EMPTY and current != owner):
+            return False
+        self.sim.set_cell(pos, code)
+        return True
+        
+    def remote_code(self, player_id):
+        """Grid code for a remote player's snake"""
+        code = self.remote_codes.get(player_id)
+        if code is None:
+            # Remote snakes are drawn but never collided with locally
+            code = self.sim.register_snake(consts.back_color, solid=False)
+            self.remote_codes[player_id] = code
+        return code
+        
+    def update(self):
+        """Advance one tick, recording the local move for reconciliation"""
+        snake = self.local_snake
+        direction = snake.direction if snake else None
+        self.sim.tick()
+        if snake and snake.alive:
+            self.prediction.record(self.sim.turn, direction, snake.get_head(), snake.length)
+            
+    def draw_motion(self, alpha):
+        """Slide the local head into its next cell by the fraction of the tick elapsed"""
+        if self.motion_cell is not None:
+            self.render_cell(self.motion_cell)
+            self.motion_cell = None
+            
+        snake = self.local_snake
+        if not snake or not snake.alive:
+            return
+        pos = snake.next_head()
+        # Only preview moves into free cells, anything else is resolved next tick
+        if self.grid.get(pos) not in (grid.EMPTY, grid.FRUIT):
+            return
+        self.cells[pos[0]][pos[1]].draw_partial(self.color_of(snake.code), alpha, snake.xx, snake.yy)
+        self.motion_cell = pos
+        
     def handle(self, keys):
         """Handle player input"""
         if self.local_snake:
@@ -163,10 +339,35 @@ class GameManager:
         """Draw game state"""
         # Draw HUD with score
         if self.local_snake:
-            import pygame
-            font = pygame.font.Font(None, 24)
-            score_text = font.render(f"Score: {self.local_snake.score}", True, (255, 255, 255))
+            score_text = shared_cache.render(get_font(24), f"Score: {self.local_snake.score}", True, (255, 255, 255))
             self.screen.blit(score_text, (10, 10))
-            pygame.display.update(pygame.Rect(0, 0, 200, 40))
+            self.dirty.add((0, 0, 200, 40))
+            
+    def flush(self):
+        """Push this frame's changed cells to the display in one update"""
+        return self.dirty.flush()
 
-            
\ No newline at end of file
+            
+
+def body_changes(previous, body):
+    """Cells a body gained and lost since the previous one, (added, removed).
+    
+    A moving snake loses some tail cells and gains head cells; finding the
+    new tail in the old body costs O(cells dropped), and the old head and
+    middle must line up with the new body. Anything else (a teleport or a
+    keyframe correction) falls back to a full comparison.
+    """
+    if previous and body:
+        try:
+            drop = previous.index(body[0])
+        except ValueError:
+            drop = None
+        if drop is not None:
+            kept = len(previous) - drop
+            middle = kept // 2
+            if (kept <= len(body) and body[kept - 1] == previous[-1]
+                    and body[middle] == previous[drop + middle]):
+                return body[kept:], previous[:drop]
+    old = set(previous)
+    new = set(body)
+    return [cell for cell in body if cell not in old], [cell for cell in previous if cell not in new]
\ No newline at end of file
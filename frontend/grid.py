@@ -0,0 +1,52 @@
+"""Compact occupancy grid, the single source of truth for what each cell holds"""
+
+# Entity codes stored per cell
+EMPTY = 0
+BLOCK = 1
+FRUIT = 2
+SNAKE = 3  # First snake id; snake n is stored as SNAKE + n
+DEAD = 0x80  # Flag OR-ed onto a snake code once that snake has died
+
+MAX_SNAKES = DEAD - SNAKE
+
+class Grid:
+    def __init__(self, size):
+        self.size = size
+        # One byte per cell, indexed by x * size + y
+        self.cells = bytearray(size * size)
+        
+    def index(self, pos):
+        """Flat index of a position"""
+        return pos[0] * self.size + pos[1]
+        
+    def position(self, index):
+        """Position of a flat index"""
+        return divmod(index, self.size)
+        
+    def in_bounds(self, pos):
+        """Check that a position lies on the board"""
+        return 0 <= pos[0] < self.size and 0 <= pos[1] < self.size
+        
+    def get(self, pos):
+        """Entity code at position"""
+        return self.cells[pos[0] * self.size + pos[1]]
+        
+    def set(self, pos, code):
+        """Store entity code at position"""
+        self.cells[pos[0] * self.size + pos[1]] = code
+        
+    def is_empty(self, pos):
+        """Check if nothing occupies the position"""
+        return self.cells[pos[0] * self.size + pos[1]] == EMPTY
+        
+    def is_fruit(self, pos):
+        """Check if the position holds a fruit"""
+        return self.cells[pos[0] * self.size + pos[1]] == FRUIT
+        
+    def is_dead(self, pos):
+        """Check if the position holds part of a dead snake"""
+        return self.cells[pos[0] * self.size + pos[1]] & DEAD != 0
+        
+    def is_block(self, pos):
+        """Check if the position holds a block"""
+        return self.cells[pos[0] * self.size + pos[1]] == BLOCK
\ No newline at end of file
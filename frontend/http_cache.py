@@ -0,0 +1,103 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import http_session
+
+class CacheEntry:
+    """Last known response for a URL"""
+    __slots__ = ('data', 'status', 'error', 'fetched_at')
+    
+    def __init__(self):
+        self.data = None  # Parsed JSON of the last successful response
+        self.status = None  # HTTP status of the last response
+        self.error = None  # Exception text of the last failed request
+        self.fetched_at = 0.0
+
+class BackgroundFetcher:
+    """Fetches JSON endpoints on worker threads and serves cached results.
+    
+    get() never blocks: it returns whatever is cached (possibly stale, or
+    None before the first response) and schedules a refresh when the entry
+    is missing or older than its TTL. Requests go through transport(url,
+    timeout) -> (status, data), the pooled HTTP session unless replaced.
+    """
+    
+    def __init__(self, ttl=5.0, timeout=5, max_workers=2, transport=None):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.transport = transport or http_session.get_json
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='http-fetch')
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.in_flight = set()
+        self.stats = {
+            'requests': 0,
+            'failures': 0,
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0
+        }
+        
+    def get(self, url, ttl=None):
+        """Cached entry for url, refreshed out of band when missing or stale"""
+        ttl = self.ttl if ttl is None else ttl
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is None:
+                self.stats['misses'] += 1
+            elif time.monotonic() - entry.fetched_at < ttl:
+                self.stats['hits'] += 1
+                return entry
+            else:
+                self.stats['stale_hits'] += 1
+                
+            if url not in self.in_flight:
+                self.in_flight.add(url)
+                self.executor.submit(self._fetch, url)
+        return entry
+        
+    def invalidate(self, url=None):
+        """Mark one URL (or everything) stale so the next get() refreshes it"""
+        with self.lock:
+            if url is None:
+                entries = list(self.entries.values())
+            else:
+                entries = [self.entries[url]] if url in self.entries else []
+            for entry in entries:
+                entry.fetched_at = 0.0
+                
+    def _fetch(self, url):
+        """Worker: perform the request and publish the result"""
+        data = status = error = None
+        try:
+            status, data = self.transport(url, self.timeout)
+        except Exception as e:
+            error = str(e)
+            
+        with self.lock:
+            self.in_flight.discard(url)
+            self.stats['requests'] += 1
+            if data is None:
+                self.stats['failures'] += 1
+                
+            entry = self.entries.get(url)
+            if entry is None:
+                entry = self.entries[url] = CacheEntry()
+            # Keep serving the previous data if a refresh fails
+            if data is not None or entry.data is None:
+                entry.data = data
+            entry.status = status
+            entry.error = error
+            entry.fetched_at = time.monotonic()
+            
+    def get_stats(self):
+        """Request counts and cache hit rate"""
+        with self.lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else 0.0
+        return stats
+        
+    def shutdown(self):
+        """Stop worker threads without waiting for requests in flight"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
\ No newline at end of file
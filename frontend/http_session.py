@@ -0,0 +1,93 @@
+"""One pooled requests.Session shared by every HTTP caller in the client.
+
+A Session keeps connections alive per host, so repeated requests to the
+game server or the auth endpoints skip the TCP (and TLS) handshake.
+requests.Session is safe to share between the fetcher's worker threads
+for plain requests. POSTs retry transient failures with jittered
+exponential backoff, so clients failing together do not retry together.
+"""
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+# Hosts with pooled connections, and connections kept per host
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+
+# Retries after the first attempt, and the backoff bounds in seconds
+RETRIES = 2
+BACKOFF_BASE = 0.2
+BACKOFF_MAX = 2.0
+
+# Statuses worth another try: rate limited or the server briefly unavailable
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+_session = None
+_lock = threading.Lock()
+_stats = {
+    'requests': 0,
+    'retries': 0,
+    'failures': 0
+}
+
+def _count(key):
+    with _lock:
+        _stats[key] += 1
+
+def get_session():
+    """The shared session, created on first use"""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+def get_json(url, timeout):
+    """GET a JSON endpoint, returns (status, data) with data None unless the status is 200"""
+    _count('requests')
+    response = get_session().get(url, timeout=timeout)
+    if response.status_code != 200:
+        return response.status_code, None
+    return response.status_code, response.json()
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff before retry number attempt (from 0)"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def post_json(url, payload, timeout, retries=RETRIES, idempotent=True):
+    """POST a JSON payload, retrying transient failures; returns the last response.
+    
+    A request that timed out connecting never reached the server and is
+    always retried. Read timeouts, dropped connections and retryable
+    statuses are retried only for idempotent requests.
+    """
+    session = get_session()
+    for attempt in range(retries + 1):
+        last = attempt == retries
+        _count('requests')
+        try:
+            response = session.post(url, json=payload, timeout=timeout)
+        except requests.exceptions.ConnectTimeout:
+            if last:
+                _count('failures')
+                raise
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if last or not idempotent:
+                _count('failures')
+                raise
+        else:
+            if last or not idempotent or response.status_code not in RETRY_STATUSES:
+                return response
+        _count('retries')
+        time.sleep(backoff_delay(attempt))
+
+def get_stats():
+    """Requests sent, retries taken and requests that failed for good"""
+    with _lock:
+        return dict(_stats)
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""Snapshot buffer that renders remote snakes slightly in the past.
+
+Remote snake updates are stamped with the sender's sim tick and the local
+time they arrived. Each player gets a small ring of snapshots plus an
+estimate of how their ticks map onto local time; sampling at now - delay
+finds the two snapshots around that moment and walks the body between
+them one cell per tick, so late or skipped updates no longer show up as
+stutter or teleports. The delay grows with the measured arrival jitter.
+"""
+from collections import deque
+
+# Snapshots kept per player
+SNAPSHOT_CAPACITY = 32
+
+# Render delay bounds in seconds, the adaptive delay stays within them
+MIN_DELAY = 0.05
+MAX_DELAY = 0.5
+
+# Jitter multiples added on top of one tick of delay
+JITTER_MARGIN = 2.0
+
+# Smoothing weights for the jitter and clock drift estimates
+JITTER_GAIN = 1 / 16
+DRIFT_GAIN = 1 / 64
+
+class Snapshot:
+    """One remote snake body at a sender tick"""
+    __slots__ = ('tick', 'cells', 'received_at')
+    
+    def __init__(self, tick, cells, received_at):
+        self.tick = tick
+        self.cells = cells
+        self.received_at = received_at
+
+class Track:
+    """Snapshots and clock estimate for one remote player"""
+    __slots__ = ('snapshots', 'offset', 'cached')
+    
+    def __init__(self, capacity):
+        self.snapshots = deque(maxlen=capacity)
+        self.offset = None  # Local time of the sender's tick 0, least delayed estimate
+        self.cached = None  # (snapshot, tick, body) of the last interpolation
+
+class SnapshotBuffer:
+    def __init__(self, tick_rate, delay=0.1, capacity=SNAPSHOT_CAPACITY):
+        self.dt = 1.0 / tick_rate
+        self.base_delay = delay
+        self.delay = max(delay, MIN_DELAY)
+        self.capacity = capacity
+        self.tracks = {}
+        self.jitter = 0.0  # Smoothed arrival deviation in seconds, over all players
+        self.stats = {
+            'snapshots': 0,
+            'stale': 0,
+            'underruns': 0
+        }
+        
+    def push(self, player_id, tick, cells, received_at):
+        """Add a snapshot, ignoring ones not newer than what is buffered"""
+        track = self.tracks.get(player_id)
+        if track is None:
+            track = self.tracks[player_id] = Track(self.capacity)
+        snapshots = track.snapshots
+        if snapshots and tick <= snapshots[-1].tick:
+            self.stats['stale'] += 1
+            return False
+        snapshots.append(Snapshot(tick, cells, received_at))
+        self.stats['snapshots'] += 1
+        
+        # The least delayed arrival anchors the sender's clock, later ones
+        # measure jitter; the anchor creeps up slowly to follow clock drift
+        sample = received_at - tick * self.dt
+        if track.offset is None or sample < track.offset:
+            track.offset = sample
+        else:
+            deviation = sample - track.offset
+            track.offset += deviation * DRIFT_GAIN
+            self.jitter += (deviation - self.jitter) * JITTER_GAIN
+        self.delay = min(max(self.base_delay, self.dt + JITTER_MARGIN * self.jitter, MIN_DELAY), MAX_DELAY)
+        return True
+        
+    def latest_tick(self, player_id):
+        """Tick of the newest snapshot of a player, None when there is none"""
+        track = self.tracks.get(player_id)
+        if track is None or not track.snapshots:
+            return None
+        return track.snapshots[-1].tick
+        
+    def remove(self, player_id):
+        """Forget a player that left"""
+        self.tracks.pop(player_id, None)
+        
+    def sample(self, player_id, now):
+        """Body of a player as of now - delay, None when nothing is buffered"""
+        track = self.tracks.get(player_id)
+        if track is None or not track.snapshots:
+            return None
+        snapshots = track.snapshots
+        target = (now - self.delay - track.offset) / self.dt
+        
+        if target >= snapshots[-1].tick:
+            if target >= snapshots[-1].tick + 1:
+                # Ran out of data, hold the newest body until more arrives;
+                # counted per sample, so it reads as starved frames
+                self.stats['underruns'] += 1
+            return snapshots[-1].cells
+        if target <= snapshots[0].tick:
+            return snapshots[0].cells
+            
+        # Bracketing pair, newest first since the target is usually recent
+        for index in range(len(snapshots) - 1, 0, -1):
+            before = snapshots[index - 1]
+            if before.tick <= target:
+                # Same body object while the tick stays put, so renderers can skip it
+                tick = int(target)
+                cached = track.cached
+                if cached is None or cached[0] is not before or cached[1] != tick:
+                    cached = track.cached = (before, tick, interpolate(before, snapshots[index], tick))
+                return cached[2]
+        return snapshots[0].cells
+        
+    def get_stats(self):
+        """Snapshot counts, underruns, current jitter and delay"""
+        return dict(
+            self.stats,
+            jitter_ms=self.jitter * 1000,
+            delay_ms=self.delay * 1000
+        )
+
+def interpolate(before, after, tick):
+    """Body at a tick between two snapshots, advancing one cell per tick"""
+    steps = after.tick - before.tick
+    moved = tick - before.tick
+    if moved <= 0:
+        return before.cells
+    if steps > len(after.cells):
+        # The newer body does not cover the path taken, snap to the nearer one
+        return after.cells if moved * 2 >= steps else before.cells
+        
+    path = before.cells + after.cells[len(after.cells) - steps:]
+    end = len(before.cells) + moved
+    length = round(len(before.cells) + (len(after.cells) - len(before.cells)) * moved / steps)
+    return path[max(0, end - length):end]
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""Active rooms as pushed by the server's lobby channel.
+
+subscribe_lobby answers with every active room and the lobby version, after
+which the server sends room_added, room_updated and room_removed, each with
+the next version. Changes not newer than what the index already reflects
+are ignored, so a snapshot and events that raced it can arrive in any order.
+"""
+
+class LobbyIndex:
+    def __init__(self):
+        self.rooms = {}  # room id -> summary dict, in the order rooms appeared
+        self.version = -1  # Lobby version the index reflects
+        self.subscribed = False  # Whether the server pushes changes to us
+        self.listing = []  # Rooms as a list, rebuilt only when they change
+        self.stats = {
+            'snapshots': 0,
+            'changes': 0,
+            'stale': 0
+        }
+        
+    def reset(self, rooms, version):
+        """Replace everything with a subscription snapshot"""
+        self.rooms = {room['id']: room for room in rooms}
+        self.version = version
+        self.subscribed = True
+        self.listing = list(self.rooms.values())
+        self.stats['snapshots'] += 1
+        
+    def apply(self, data, removed=False):
+        """Apply a room_added/room_updated (or room_removed) event, False when stale"""
+        version = data.get('version', 0)
+        if version <= self.version:
+            self.stats['stale'] += 1
+            return False
+        self.version = version
+        if removed:
+            self.rooms.pop(data.get('roomId'), None)
+        else:
+            room = data.get('room', {})
+            self.rooms[room.get('id')] = room
+        self.listing = list(self.rooms.values())
+        self.stats['changes'] += 1
+        return True
+        
+    def get_rooms(self):
+        """Active rooms, the same list object until something changes"""
+        return self.listing
+        
+    def get_stats(self):
+        """Snapshots and changes applied, stale changes ignored"""
+        return dict(self.stats, rooms=len(self.rooms), version=self.version)
+        
+    def __len__(self):
+        return len(self.rooms)
\ No newline at end of file
@@ -4,25 +4,37 @@ import argparse
 from game_manager import GameManager
 from snake import Snake
 from network_manager import NetworkManager
+from async_network import AsyncNetworkManager
 from auth_manager import AuthManager
 from ui_manager import UIManager
+from http_cache import BackgroundFetcher
+import http_session
+from game_loop import FixedTimestep
+from text_cache import get_font, shared_cache
+from retained import RetainedScreen, IDLE_WAIT_MS
 import consts
 
 class Game:
-    def __init__(self, debug=False):
+    def __init__(self, debug=False, async_network=False):
         pygame.init()
         self.debug = debug
+        self.async_network = async_network
         self.screen = pygame.display.set_mode((consts.width, consts.height))
         pygame.display.set_caption("Multiplayer Snake Game")
         
         self.clock = pygame.time.Clock()
-        self.font = pygame.font.Font(None, 36)
-        self.small_font = pygame.font.Font(None, 24)
+        self.timestep = FixedTimestep(consts.tick_rate)  # Sim ticks, independent of the frame rate
+        # Fonts are loaded once and shared, rendered labels are cached
+        self.font = get_font(36)
+        self.small_font = get_font(24)
+        self.text = shared_cache
+        self.retained = RetainedScreen(self.screen)  # Menus redraw only when their state changes
         
         # Managers
-        self.auth_manager = AuthManager()
+        self.auth_manager = AuthManager(identity_url=consts.identity_url, token_url=consts.token_url)
         self.network_manager = None
-        self.ui_manager = UIManager(self.screen, self.font, self.small_font)
+        self.fetcher = BackgroundFetcher(max_workers=3)  # Off-thread HTTP for lobby screens
+        self.ui_manager = UIManager(self.screen, self.font, self.small_font, self.fetcher, self.text, self.retained)
         
         # Game state
         self.state = "menu"  # menu, auth, lobby, playing, game_over
@@ -31,6 +43,7 @@ class Game:
         self.room_id = None
         self.is_host = False
         self.players = []
+        self.players_version = None  # Network state version self.players was read at
         self.should_start_game = False  # Flag for game start
         
         # UI state
@@ -42,7 +55,8 @@ class Game:
     def init_network(self):
         """Initialize network manager with callback"""
         if not self.network_manager:
-            self.network_manager = NetworkManager(consts.server_url)
+            manager = AsyncNetworkManager if self.async_network else NetworkManager
+            self.network_manager = manager(consts.server_url, fetcher=self.fetcher)
             # Set up game start callback
             self.network_manager.on_game_start = self.on_network_game_started
             
@@ -64,6 +78,11 @@ class Game:
             )
             if success:
                 self.state = "lobby"
+                # Rooms are pushed from now on; stats and leaderboard load
+                # concurrently while the lobby draws
+                if not self.network_manager.subscribe_lobby():
+                    self.network_manager.get_active_games()
+                self.ui_manager.prefetch(self.auth_manager.current_user['uid'], consts.server_url)
                 return True
             else:
                 self.error_message = "Network authentication failed"
@@ -113,7 +132,7 @@ class Game:
             snake_config = consts.snakes[0] if self.is_host else consts.snakes[1]
             self.local_snake = Snake(
                 snake_config['keys'], 
-                self.game_manager,
+                self.game_manager.sim,
                 (snake_config['sx'], snake_config['sy']),
                 snake_config['color'],
                 snake_config['direction'],
@@ -125,6 +144,7 @@ class Game:
             self.game_manager.spawn_fruit()
         
         self.state = "playing"
+        self.timestep.reset()
         print("Game started!")
         
     def handle_menu_input(self, event):
@@ -172,28 +192,26 @@ class Game:
                     self.network_manager.leave_room(self.room_id)
                 self.state = "lobby"
                 
-    def update_game(self):
-        """Update game state"""
+    def sync_network(self):
+        """Feed the latest network state to the game, once per frame"""
         if self.state == "playing" and self.game_manager:
-            # Get network updates
             game_state = self.network_manager.get_game_state()
             if game_state:
                 self.game_manager.update_from_network(game_state)
-            
+                
+    def update_game(self):
+        """Advance the local game one tick"""
+        if self.state == "playing" and self.game_manager:
             # Update local game
             self.game_manager.update()
             
             # Send updates to server
             if self.local_snake and self.local_snake.alive:
-                snake_data = {
-                    'cells': self.local_snake.cells,
-                    'direction': self.local_snake.direction,
-                    'alive': self.local_snake.alive
-                }
-                self.network_manager.send_game_update(
+                self.network_manager.send_snake_update(
                     self.room_id,
-                    snake_data,
-                    self.local_snake.score
+                    self.local_snake,
+                    self.local_snake.score,
+                    self.game_manager.turn
                 )
             
             # Check if local player died
@@ -206,42 +224,54 @@ class Game:
             if winner is not None:
                 self.state = "game_over"
     
+    def player_names(self):
+        """Ids and names of the players in the room, as a screen's state input"""
+        return tuple((player.get('id'), player.get('username')) for player in self.players)
+        
     def draw_menu(self):
         """Draw main menu"""
+        if not self.retained.changed(('menu', self.menu_selection, self.error_message, self.success_message)):
+            return
+            
         self.screen.fill(consts.back_color)
         
         # Title
-        title = self.font.render("Multiplayer Snake", True, (255, 255, 255))
+        title = self.text.render(self.font, "Multiplayer Snake", True, (255, 255, 255))
         title_rect = title.get_rect(center=(consts.width // 2, 100))
         self.screen.blit(title, title_rect)
         
         # Menu options
         for i, option in enumerate(self.menu_options):
             color = (255, 255, 0) if i == self.menu_selection else (255, 255, 255)
-            text = self.small_font.render(option, True, color)
+            text = self.text.render(self.small_font, option, True, color)
             text_rect = text.get_rect(center=(consts.width // 2, 250 + i * 50))
             self.screen.blit(text, text_rect)
         
         # Messages
         if self.error_message:
-            error_text = self.small_font.render(self.error_message, True, (255, 0, 0))
+            error_text = self.text.render(self.small_font, self.error_message, True, (255, 0, 0))
             error_rect = error_text.get_rect(center=(consts.width // 2, 450))
             self.screen.blit(error_text, error_rect)
             
         if self.success_message:
-            success_text = self.small_font.render(self.success_message, True, (0, 255, 0))
+            success_text = self.text.render(self.small_font, self.success_message, True, (0, 255, 0))
             success_rect = success_text.get_rect(center=(consts.width // 2, 450))
             self.screen.blit(success_text, success_rect)
         
-        pygame.display.flip()
+        self.retained.present()
         
     def draw_lobby(self):
         """Draw lobby screen"""
+        username = self.auth_manager.current_user.get('username', 'Player')
+        active_games = self.network_manager.get_active_games() if self.network_manager else None
+        games = tuple((game['id'], game['playerCount']) for game in active_games[:5]) if active_games else ()
+        if not self.retained.changed(('lobby', username, games)):
+            return
+            
         self.screen.fill(consts.back_color)
         
         # Welcome message
-        username = self.auth_manager.current_user.get('username', 'Player')
-        welcome = self.font.render(f"Welcome, {username}!", True, (255, 255, 255))
+        welcome = self.text.render(self.font, f"Welcome, {username}!", True, (255, 255, 255))
         welcome_rect = welcome.get_rect(center=(consts.width // 2, 50))
         self.screen.blit(welcome, welcome_rect)
         
@@ -255,41 +285,42 @@ class Game:
         ]
         
         for i, option in enumerate(options):
-            text = self.small_font.render(option, True, (255, 255, 255))
+            text = self.text.render(self.small_font, option, True, (255, 255, 255))
             text_rect = text.get_rect(center=(consts.width // 2, 150 + i * 40))
             self.screen.blit(text, text_rect)
         
         # Active games
-        if self.network_manager:
-            active_games = self.network_manager.get_active_games()
-            if active_games:
-                games_title = self.small_font.render("Active Games:", True, (255, 255, 0))
-                self.screen.blit(games_title, (50, 400))
-                
-                for i, game in enumerate(active_games[:5]):
-                    game_text = self.small_font.render(
-                        f"{game['id']}: {game['playerCount']} players",
-                        True, (200, 200, 200)
-                    )
-                    self.screen.blit(game_text, (50, 430 + i * 30))
+        if games:
+            games_title = self.text.render(self.small_font, "Active Games:", True, (255, 255, 0))
+            self.screen.blit(games_title, (50, 400))
+            
+            for i, (game_id, player_count) in enumerate(games):
+                game_text = self.text.render(self.small_font, 
+                    f"{game_id}: {player_count} players",
+                    True, (200, 200, 200)
+                )
+                self.screen.blit(game_text, (50, 430 + i * 30))
         
-        pygame.display.flip()
+        self.retained.present()
         
     def draw_waiting_room(self):
         """Draw waiting room"""
+        if not self.retained.changed(('waiting', self.room_id, self.is_host, self.player_names())):
+            return
+            
         self.screen.fill(consts.back_color)
         
         # Room info
-        room_text = self.font.render(f"Room: {self.room_id}", True, (255, 255, 255))
+        room_text = self.text.render(self.font, f"Room: {self.room_id}", True, (255, 255, 255))
         room_rect = room_text.get_rect(center=(consts.width // 2, 50))
         self.screen.blit(room_text, room_rect)
         
         # Player list
-        players_title = self.small_font.render("Players:", True, (255, 255, 0))
+        players_title = self.text.render(self.small_font, "Players:", True, (255, 255, 0))
         self.screen.blit(players_title, (100, 120))
         
         for i, player in enumerate(self.players):
-            player_text = self.small_font.render(
+            player_text = self.text.render(self.small_font, 
                 f"{i+1}. {player.get('username', 'Player')}",
                 True, (200, 200, 200)
             )
@@ -301,27 +332,31 @@ class Game:
         else:
             instruction = "Waiting for host to start..."
             
-        inst_text = self.small_font.render(instruction, True, (255, 255, 255))
+        inst_text = self.text.render(self.small_font, instruction, True, (255, 255, 255))
         inst_rect = inst_text.get_rect(center=(consts.width // 2, 400))
         self.screen.blit(inst_text, inst_rect)
         
-        back_text = self.small_font.render("ESC - Leave Room", True, (150, 150, 150))
+        back_text = self.text.render(self.small_font, "ESC - Leave Room", True, (150, 150, 150))
         back_rect = back_text.get_rect(center=(consts.width // 2, 450))
         self.screen.blit(back_text, back_rect)
         
-        pygame.display.flip()
+        self.retained.present()
         
     def draw_game_over(self):
         """Draw game over screen"""
+        # Winner info (winner_info is just the winner's user ID string)
+        winner_id = self.network_manager.get_winner_info()
+        score = self.game_manager.local_snake.score if self.game_manager and self.game_manager.local_snake else None
+        if not self.retained.changed(('game_over', winner_id, score, self.player_names())):
+            return
+            
         self.screen.fill(consts.back_color)
         
         # Game over text
-        game_over = self.font.render("Game Over!", True, (255, 255, 255))
+        game_over = self.text.render(self.font, "Game Over!", True, (255, 255, 255))
         game_over_rect = game_over.get_rect(center=(consts.width // 2, 200))
         self.screen.blit(game_over, game_over_rect)
         
-        # Winner info (winner_info is just the winner's user ID string)
-        winner_id = self.network_manager.get_winner_info()
         if winner_id:
             # Find winner's username from players list
             winner_username = "Unknown"
@@ -330,7 +365,7 @@ class Game:
                     winner_username = player.get('username', 'Unknown')
                     break
             
-            winner_text = self.small_font.render(
+            winner_text = self.text.render(self.small_font, 
                 f"Winner: {winner_username}",
                 True, (255, 255, 0)
             )
@@ -338,20 +373,20 @@ class Game:
             self.screen.blit(winner_text, winner_rect)
         
         # Your score
-        if self.game_manager and self.game_manager.local_snake:
-            score_text = self.small_font.render(
-                f"Your Score: {self.game_manager.local_snake.score}",
+        if score is not None:
+            score_text = self.text.render(self.small_font, 
+                f"Your Score: {score}",
                 True, (200, 200, 200)
             )
             score_rect = score_text.get_rect(center=(consts.width // 2, 300))
             self.screen.blit(score_text, score_rect)
         
         # Return to lobby
-        back_text = self.small_font.render("Press ENTER to return to lobby", True, (200, 200, 200))
+        back_text = self.text.render(self.small_font, "Press ENTER to return to lobby", True, (200, 200, 200))
         back_rect = back_text.get_rect(center=(consts.width // 2, 400))
         self.screen.blit(back_text, back_rect)
         
-        pygame.display.flip()
+        self.retained.present()
         
     def run(self):
         """Main game loop"""
@@ -359,9 +394,20 @@ class Game:
         self.authenticate_user()
         
         running = True
+        reported = 0
+        idle = False
         while running:
-            self.clock.tick(10)  # 10 FPS for snake game
+            # Menus sleep until input arrives or the idle timeout passes, so
+            # static screens cost nothing; the game itself never waits here
+            woken = None
+            if idle and self.state != "playing":
+                woken = pygame.event.wait(IDLE_WAIT_MS)
+            self.clock.tick(consts.fps)  # Input and drawing at display rate
             
+            # Apply network events received since the last frame
+            if self.network_manager:
+                self.network_manager.poll()
+                
             # Check if game should start (from network event)
             if self.should_start_game and self.state == "waiting":
                 self.start_game()
@@ -369,11 +415,17 @@ class Game:
             
             # Collect all events first
             events = pygame.event.get()
+            if woken is not None and woken.type != pygame.NOEVENT:
+                events.insert(0, woken)
+            # Input may change what is drawn, check again next frame before sleeping
+            idle = not events
             
             # Handle events
             for event in events:
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    self.retained.invalidate()
                     
                 if self.state == "menu":
                     running = self.handle_menu_input(event)
@@ -392,12 +444,21 @@ class Game:
                         self.game_manager = None
                         self.room_id = None
                         
-            # Update game state
+            # Update game state, the simulation catches up in fixed ticks
             if self.state == "playing":
-                self.update_game()
+                # Remote snakes are interpolated per frame, not per tick
+                self.sync_network()
+                for _ in range(self.timestep.advance()):
+                    self.update_game()
+                    if self.state != "playing":
+                        break
+                if self.debug and self.timestep.windows != reported:
+                    reported = self.timestep.windows
+                    print(f"Loop stats: {self.timestep.get_stats()}")
             elif self.state in ["waiting", "lobby"]:
-                # Poll for updates
-                if self.network_manager:
+                # Players only change through network events, re-read after one
+                if self.network_manager and self.network_manager.state_version != self.players_version:
+                    self.players_version = self.network_manager.state_version
                     self.players = self.network_manager.get_players()
                 
             # Draw based on state
@@ -418,8 +479,11 @@ class Game:
             elif self.state == "waiting":
                 self.draw_waiting_room()
             elif self.state == "playing":
-                # Game is drawn via cell updates in game_manager
-                pass
+                # Game is drawn via cell updates in game_manager, flushed once per frame
+                self.retained.invalidate()
+                if self.game_manager:
+                    self.game_manager.draw_motion(self.timestep.alpha)
+                    self.game_manager.flush()
             elif self.state == "game_over":
                 self.draw_game_over()
             elif self.state == "join_input":
@@ -447,14 +511,25 @@ class Game:
             if self.room_id:
                 self.network_manager.leave_room(self.room_id)
             self.network_manager.disconnect()
+        if self.debug:
+            print(f"HTTP cache stats: {self.fetcher.get_stats()}")
+            print(f"HTTP session stats: {http_session.get_stats()}")
+            if self.network_manager:
+                print(f"RPC stats: {self.network_manager.get_rpc_stats()}")
+                print(f"Event inbox stats: {self.network_manager.inbox.get_stats()}")
+                print(f"Lobby stats: {self.network_manager.lobby.get_stats()}")
+            print(f"Text cache stats: {self.text.get_stats()}")
+            print(f"Menu redraw stats: {self.retained.get_stats()}")
+        self.fetcher.shutdown()
         pygame.quit()
 
 def main():
     parser = argparse.ArgumentParser(description='Multiplayer Snake Game')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('--async-network', action='store_true', help='Run Socket.IO on an asyncio event loop thread')
     args = parser.parse_args()
     
-    game = Game(debug=args.debug)
+    game = Game(debug=args.debug, async_network=args.async_network)
     game.run()
 
 if __name__ == '__main__':
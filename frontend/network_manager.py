@@ -1,18 +1,78 @@
 import socketio
-import requests
-from threading import Thread
+from threading import Thread, RLock, Event
+from collections import deque
+from itertools import count
+from copy import copy
 import time
+from http_cache import BackgroundFetcher
+from delta import DeltaEncoder, DeltaDecoder
+from player_registry import PlayerRegistry
+from lobby_index import LobbyIndex
+from event_inbox import EventInbox
+import http_session
+import wire
+
+# Seconds the lobby's active game list may be served from cache, when the
+# server has no lobby channel to push it
+ACTIVE_GAMES_TTL = 2
+
+# Seconds to wait for the server to acknowledge a call
+RPC_TIMEOUT = 5
+
+# Seconds to wait after connecting for the wire_format handshake
+HANDSHAKE_TIMEOUT = 1
+
+# Seconds per frame the main loop may spend applying network events
+POLL_BUDGET = 0.004
+
+# Consecutive http_request timeouts while connected before REST goes back to HTTP
+HTTP_SOCKET_TIMEOUTS = 3
 
 class NetworkManager:
-    def __init__(self, server_url):
+    def __init__(self, server_url, fetcher=None):
         self.server_url = server_url
-        self.sio = socketio.Client()
+        self.fetcher = fetcher or BackgroundFetcher()
+        self.sio = self.create_client()
         self.connected = False
         self.authenticated = False
         self.player_data = {}
         self.game_state = {}
         self.players = []
         self.winner_info = None
+        self.registry = PlayerRegistry()  # Room membership by id, rebuilt on join/leave/start
+        self.lobby = LobbyIndex()  # Active rooms, kept current by lobby events
+        
+        # Sequenced snake deltas, ours going out and one decoder per remote player
+        self.encoder = DeltaEncoder()
+        self.decoders = {}
+        
+        # Cell encoding for snake messages, JSON until the server agrees to binary
+        self.wire = wire.JSON
+        
+        # Correlation ids and per-event latency of acknowledged calls
+        self.request_ids = count(1)
+        self.rpc_stats = {}
+        
+        # Events wait here until the main loop runs their handlers in poll()
+        self.inbox = EventInbox(on_drop=self.on_event_dropped)
+        self.handlers = {}
+        self.dropped_deltas = deque()  # (room id, player id, seq) of deltas the inbox dropped
+        
+        # Handlers mutate the state above under this lock; readers get a copy
+        # rebuilt only when the version moved on since their last read
+        self.state_lock = RLock()
+        self.state_version = 0
+        self.snapshot_version = -1
+        self.snapshot = ({}, [])
+        self.cell_copies = {}  # player id -> (cells, seq, copy) from the last snapshot
+        
+        # Optional events the server announced in its handshake; REST
+        # requests ride on the socket when it serves them, until they keep
+        # timing out
+        self.server_features = frozenset()
+        self.handshake = Event()
+        self.http_over_socket = True
+        self.http_timeouts = 0
         
         # Callbacks
         self.on_game_start = None  # Callback for when game starts
@@ -22,109 +82,347 @@ class NetworkManager:
         
         # Connect to server
         try:
-            self.sio.connect(server_url)
+            self.connect_client(server_url)
+            # Requests made right after connecting must already know what
+            # the server supports; servers without the handshake time out
+            self.handshake.wait(HANDSHAKE_TIMEOUT)
             self.connected = True
             print(f"Connected to server: {server_url}")
+            # Lobby screens fetch through the open connection from now on
+            self.fetcher.transport = self.fetch_json
         except Exception as e:
             print(f"Failed to connect to server: {e}")
             
+    def create_client(self):
+        """Socket.IO client whose handlers run on its own reader thread"""
+        return socketio.Client()
+        
+    def connect_client(self, server_url):
+        """Open the connection, offering the binary wire format"""
+        self.sio.connect(server_url, auth={'wire': wire.BINARY})
+        
+    def disconnect_client(self):
+        """Close the connection"""
+        self.sio.disconnect()
+        
+    def emit(self, event, data):
+        """Send an event without waiting for a reply"""
+        self.sio.emit(event, data)
+        
+    def send_call(self, event, data, timeout):
+        """Send an event and block until it is acknowledged"""
+        return self.sio.call(event, data, timeout=timeout)
+        
+    def on(self, event):
+        """Register a handler; the socket thread only queues the event for poll()"""
+        def register(handler):
+            self.handlers[event] = handler
+            self.sio.on(event, lambda data=None: self.inbox.post(event, data))
+            return handler
+        return register
+        
+    def dispatch(self, event, data):
+        """Run a queued event's handler under the state lock and publish its changes"""
+        with self.state_lock:
+            self.handlers[event](data)
+            self.state_version += 1
+            
+    def poll(self, budget=POLL_BUDGET):
+        """Apply queued network events on the calling (main) thread, returns how many"""
+        handled = self.inbox.drain(self.dispatch, budget)
+        if self.dropped_deltas:
+            self.resync_dropped()
+        return handled
+        
+    def on_event_dropped(self, event, data):
+        """Socket thread: remember whose delta the full inbox shed"""
+        self.dropped_deltas.append((data.get('roomId'), data.get('playerId'), data.get('seq')))
+        
+    def resync_dropped(self):
+        """Mark decoders that lost deltas as out of sync, one keyframe request per player"""
+        now = time.monotonic()
+        with self.state_lock:
+            while self.dropped_deltas:
+                room_id, player_id, seq = self.dropped_deltas.popleft()
+                decoder = self.decoders.setdefault(player_id, DeltaDecoder())
+                if decoder.seq is not None and seq is not None and decoder.seq >= seq:
+                    continue  # A keyframe already covered it
+                decoder.seq = None  # Later deltas wait for the keyframe
+                if decoder.request_resync(now):
+                    self.emit('request_keyframe', {
+                        'roomId': room_id,
+                        'playerId': player_id
+                    })
+        
+    def set_game_state(self, game):
+        """Replace the room state from a server reply"""
+        with self.state_lock:
+            self.game_state = game
+            self.players = game.get('players', [])
+            self.registry.update(self.players)
+            self.state_version += 1
+            
     def setup_handlers(self):
         """Setup Socket.IO event handlers"""
         
-        @self.sio.on('authenticated')
+        # Applied on the socket thread rather than through the inbox, so it
+        # takes effect before connecting returns instead of at the first poll()
+        def on_wire_format(data):
+            self.wire = data.get('format', wire.JSON)
+            self.server_features = frozenset(data.get('features', []))
+            self.handshake.set()
+        self.sio.on('wire_format', on_wire_format)
+            
+        @self.on('authenticated')
         def on_authenticated(data):
             self.authenticated = True
             self.player_data = data
+            self.registry.local_id = data.get('userId')
             print(f"Authenticated as: {data.get('username')}")
             
-        @self.sio.on('auth_error')
+        @self.on('auth_error')
         def on_auth_error(data):
             print(f"Authentication error: {data.get('message')}")
             self.authenticated = False
             
-        @self.sio.on('room_created')
+        @self.on('room_created')
         def on_room_created(data):
             print(f"Room created: {data.get('roomId')}")
             self.game_state = data.get('game', {})
             self.players = self.game_state.get('players', [])
+            self.registry.update(self.players)
             
-        @self.sio.on('player_joined')
+        @self.on('player_joined')
         def on_player_joined(data):
             print(f"Player joined: {data.get('username')}")
             self.game_state = data.get('game', {})
             self.players = self.game_state.get('players', [])
+            self.registry.update(self.players)
             
-        @self.sio.on('player_left')
+        @self.on('player_left')
         def on_player_left(data):
             print(f"Player left: {data.get('username')}")
             # Update players list
             game_state = data.get('game', {})
             if game_state:
                 self.players = game_state.get('players', [])
+            else:
+                self.players = [player for player in self.players if player.get('id') != data.get('playerId')]
+            self.registry.update(self.players)
             
-        @self.sio.on('game_started')
+        @self.on('game_started')
         def on_game_started(data):
             print("Game started!")
+            self.encoder = DeltaEncoder()
+            self.decoders = {}
             self.game_state = data.get('game', {})
+            self.registry.update(self.game_state.get('players', self.players))
             # Trigger callback if set
             if self.on_game_start:
                 self.on_game_start()
             
-        @self.sio.on('game_state')
+        @self.on('game_state')
         def on_game_state(data):
+            # Full states double as keyframes for every snake they carry
+            for player_id, snake_data in data.get('snakes', []):
+                cells = snake_data.get('cells', [])
+                if snake_data.get('seq') is not None:
+                    decoder = self.decoders.setdefault(player_id, DeltaDecoder())
+                    decoder.apply({'seq': snake_data['seq'], 'keyframe': True, 'cells': cells})
+                    snake_data['cells'] = decoder.cells
+                    snake_data['packed'] = decoder.packed
+                elif isinstance(cells, (bytes, bytearray)):
+                    snake_data['cells'] = wire.unpack(cells)
+                    snake_data['packed'] = True
+                snake_data['received_at'] = time.monotonic()
             self.game_state = data
             self.players = data.get('players', [])
             
-        @self.sio.on('player_died')
+        @self.on('snake_delta')
+        def on_snake_delta(data):
+            player_id = data.get('playerId')
+            decoder = self.decoders.setdefault(player_id, DeltaDecoder())
+            if not decoder.apply(data):
+                # Sequence gap, ignore deltas until the server resends the body;
+                # one request per gap, not one per delta that arrives meanwhile
+                if decoder.request_resync(time.monotonic()):
+                    self.emit('request_keyframe', {
+                        'roomId': data.get('roomId'),
+                        'playerId': player_id
+                    })
+                return
+            self.apply_snake_delta(player_id, decoder, data)
+            
+        @self.on('keyframe_request')
+        def on_keyframe_request(data):
+            # The server lost track of our snake, send the whole body next
+            self.encoder.request_keyframe()
+            
+        @self.on('player_died')
         def on_player_died(data):
             print(f"Player died: {data.get('username')}")
             
-        @self.sio.on('game_over')
+        @self.on('game_over')
         def on_game_over(data):
             print("Game over!")
             self.winner_info = data.get('winner')
             self.game_state = data.get('finalState', {})
             print(f"Winner ID: {self.winner_info}")
             
-        @self.sio.on('error')
+        @self.on('room_added')
+        def on_room_added(data):
+            self.lobby.apply(data)
+            
+        @self.on('room_updated')
+        def on_room_updated(data):
+            self.lobby.apply(data)
+            
+        @self.on('room_removed')
+        def on_room_removed(data):
+            self.lobby.apply(data, removed=True)
+            
+        @self.on('error')
         def on_error(data):
             print(f"Error: {data.get('message')}")
             
+    def call(self, event, data, timeout=RPC_TIMEOUT):
+        """Emit an event and wait for the server's acknowledgement, None on failure"""
+        try:
+            return self.send_request(event, data, timeout)
+        except socketio.exceptions.TimeoutError:
+            print(f"No reply to {event} within {timeout}s")
+        except socketio.exceptions.SocketIOError as e:
+            print(f"Call {event} failed: {e}")
+        return None
+        
+    def send_request(self, event, data, timeout):
+        """Emit an event and return the server's acknowledgement, raising SocketIOError on failure.
+        
+        Safe from any thread: the fetcher's workers call it too, so the
+        stats are only touched under the state lock.
+        """
+        request_id = next(self.request_ids)
+        with self.state_lock:
+            stats = self.rpc_stats.setdefault(event, {
+                'calls': 0,
+                'timeouts': 0,
+                'errors': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0
+            })
+            stats['calls'] += 1
+            
+        start = time.perf_counter()
+        try:
+            reply = self.send_call(event, dict(data, requestId=request_id), timeout)
+        except socketio.exceptions.TimeoutError:
+            with self.state_lock:
+                stats['timeouts'] += 1
+            raise
+        except socketio.exceptions.SocketIOError:
+            with self.state_lock:
+                stats['errors'] += 1
+            raise
+        elapsed = (time.perf_counter() - start) * 1000
+        
+        with self.state_lock:
+            if not isinstance(reply, dict) or reply.get('requestId') != request_id:
+                stats['errors'] += 1
+                raise socketio.exceptions.SocketIOError(f"Unexpected reply: {reply}")
+            stats['total_ms'] += elapsed
+            stats['max_ms'] = max(stats['max_ms'], elapsed)
+        return reply
+        
+    def fetch_json(self, url, timeout):
+        """Fetcher transport: GET our server's endpoints over the socket, anything else over HTTP"""
+        if not (self.connected and self.http_over_socket and 'http_request' in self.server_features
+                and url.startswith(self.server_url)):
+            return http_session.get_json(url, timeout)
+            
+        try:
+            reply = self.send_request('http_request', {
+                'method': 'GET',
+                'path': url[len(self.server_url):] or '/'
+            }, timeout)
+        except socketio.exceptions.TimeoutError:
+            # A slow handler, replaying it over HTTP would only wait again; the
+            # fetcher keeps serving the last data. Give up on the socket only
+            # when it keeps happening on a live connection.
+            with self.state_lock:
+                self.http_timeouts += 1
+                if self.http_timeouts >= HTTP_SOCKET_TIMEOUTS and self.sio.connected:
+                    self.http_over_socket = False
+            raise
+        except socketio.exceptions.SocketIOError:
+            # Disconnected or reconnecting, send just this request over HTTP
+            return http_session.get_json(url, timeout)
+            
+        with self.state_lock:
+            self.http_timeouts = 0
+        status = reply.get('status')
+        return status, reply.get('body') if status == 200 else None
+        
+    def get_rpc_stats(self):
+        """Call counts and latency per event"""
+        result = {}
+        with self.state_lock:
+            for event, stats in self.rpc_stats.items():
+                answered = stats['calls'] - stats['timeouts'] - stats['errors']
+                result[event] = dict(stats, avg_ms=stats['total_ms'] / answered if answered > 0 else 0.0)
+        return result
+        
     def authenticate(self, id_token, username):
         """Authenticate with the server"""
         if not self.connected:
             return False
             
-        self.sio.emit('authenticate', {
+        reply = self.call('authenticate', {
             'idToken': id_token,
             'username': username
         })
-        
-        # Wait for authentication
-        timeout = 5
-        start_time = time.time()
-        while not self.authenticated and time.time() - start_time < timeout:
-            time.sleep(0.1)
+        if reply is None:
+            return False
             
+        self.authenticated = reply.get('ok', False)
+        if self.authenticated:
+            self.player_data = {'userId': reply.get('userId'), 'username': reply.get('username')}
+            self.registry.local_id = reply.get('userId')
         return self.authenticated
         
+    def subscribe_lobby(self):
+        """Join the lobby channel and load its snapshot, returns whether the server has one"""
+        # Only servers announcing the channel are asked, others would leave
+        # the call hanging until it times out
+        if not self.connected or 'subscribe_lobby' not in self.server_features:
+            return False
+            
+        reply = self.call('subscribe_lobby', {})
+        if not reply or not reply.get('ok'):
+            return False
+            
+        with self.state_lock:
+            self.lobby.reset(reply.get('rooms', []), reply.get('version', 0))
+            self.state_version += 1
+        return True
+        
     def create_room(self, config):
-        """Create a new game room"""
+        """Create a new game room, returns its id or None"""
         if not self.authenticated:
             print("Not authenticated")
             return None
             
-        self.sio.emit('create_room', {
+        reply = self.call('create_room', {
             'config': config,
             'color': [0, 255, 0]
         })
-        
-        # Wait for room creation
-        time.sleep(0.5)
-        return self.game_state.get('id')
+        if not reply or not reply.get('ok'):
+            return None
+            
+        self.set_game_state(reply.get('game', {}))
+        return reply.get('roomId')
         
     def join_room(self, room_id, color=None):
-        """Join an existing game room"""
+        """Join an existing game room, returns whether the server accepted"""
         if not self.authenticated:
             print("Not authenticated")
             return False
@@ -132,48 +430,115 @@ class NetworkManager:
         if color is None:
             color = [0, 0, 255]
             
-        self.sio.emit('join_room', {
+        reply = self.call('join_room', {
             'roomId': room_id,
             'color': color
         })
-        
-        # Wait a bit for join confirmation
-        time.sleep(0.3)
+        if not reply or not reply.get('ok'):
+            return False
+            
+        self.set_game_state(reply.get('game', {}))
         return True
         
     def start_game(self, room_id):
         """Start the game (host only)"""
-        self.sio.emit('start_game', {
+        self.emit('start_game', {
             'roomId': room_id
         })
         
     def send_game_update(self, room_id, snake_data, score):
         """Send game state update to server"""
-        self.sio.emit('game_update', {
+        self.emit('game_update', {
             'roomId': room_id,
             'snakeData': snake_data,
             'score': score
         })
         
+    def send_snake_update(self, room_id, snake, score, tick=None):
+        """Send the local snake as a sequenced delta (or periodic keyframe) for a sim tick"""
+        binary = self.wire == wire.BINARY and wire.supports_binary(snake.cells.size)
+        snake_data = self.encoder.encode(snake.cells, binary)
+        snake_data['direction'] = snake.direction
+        snake_data['alive'] = snake.alive
+        snake_data['tick'] = tick
+        self.send_game_update(room_id, snake_data, score)
+        
+    def apply_snake_delta(self, player_id, decoder, data):
+        """Reflect a decoded remote snake into game_state"""
+        snakes = self.game_state.setdefault('snakes', [])
+        for entry in snakes:
+            if entry[0] == player_id:
+                snake_data = entry[1]
+                break
+        else:
+            snake_data = {}
+            snakes.append([player_id, snake_data])
+            
+        snake_data['cells'] = decoder.cells
+        snake_data['packed'] = decoder.packed
+        snake_data['seq'] = decoder.seq
+        snake_data['direction'] = data.get('direction')
+        snake_data['alive'] = data.get('alive', True)
+        snake_data['tick'] = data.get('tick')
+        snake_data['received_at'] = time.monotonic()
+        
+        for player in self.game_state.get('players', []):
+            if player.get('id') == player_id and 'score' in data:
+                player['score'] = data['score']
+                
     def send_player_died(self, room_id):
         """Notify server that player died"""
-        self.sio.emit('player_died', {
+        self.emit('player_died', {
             'roomId': room_id
         })
         
     def leave_room(self, room_id):
         """Leave the current room"""
-        self.sio.emit('leave_room', {
+        self.emit('leave_room', {
             'roomId': room_id
         })
         
     def get_game_state(self):
-        """Get current game state"""
-        return self.game_state
+        """Get a consistent copy of the current game state"""
+        return self.read_snapshot()[0]
         
     def get_players(self):
         """Get list of players in current game"""
-        return self.players
+        return self.read_snapshot()[1]
+        
+    def read_snapshot(self):
+        """Game state and players as of the latest handler, copied once per change"""
+        with self.state_lock:
+            if self.snapshot_version != self.state_version:
+                copies = {}
+                game_state = dict(self.game_state)
+                if 'snakes' in game_state:
+                    game_state['snakes'] = [
+                        [player_id, dict(snake_data, cells=self.copy_cells(player_id, snake_data, copies))]
+                        for player_id, snake_data in game_state['snakes']
+                    ]
+                    self.cell_copies = copies
+                    # Indexed once per change rather than by every reader per frame
+                    game_state['snakes_by_id'] = dict(game_state['snakes'])
+                if 'players' in game_state:
+                    game_state['players'] = [dict(player) for player in game_state['players']]
+                self.snapshot = (game_state, [dict(player) for player in self.players])
+                self.snapshot_version = self.state_version
+            return self.snapshot
+            
+    def copy_cells(self, player_id, snake_data, copies):
+        """Snapshot copy of a body, reused until its decoder moved on or replaced it.
+        
+        Decoders mutate their cells in place and bump seq on every change, so
+        only snakes that changed since the last snapshot are copied again.
+        """
+        cells = snake_data.get('cells', [])
+        seq = snake_data.get('seq')
+        cached = self.cell_copies.get(player_id)
+        if cached is None or cached[0] is not cells or cached[1] != seq:
+            cached = (cells, seq, copy(cells))
+        copies[player_id] = cached
+        return cached[2]
         
     def get_player_data(self):
         """Get current player data"""
@@ -184,18 +549,19 @@ class NetworkManager:
         return self.winner_info
         
     def get_active_games(self):
-        """Get list of active games from REST API"""
-        try:
-            response = requests.get(f"{self.server_url}/api/games/active", timeout=5)
-            if response.status_code == 200:
-                return response.json().get('games', [])
-        except Exception as e:
-            print(f"Error fetching active games: {e}")
-        return []
+        """Get list of active games, pushed over the lobby channel or polled over REST"""
+        if self.lobby.subscribed:
+            return self.lobby.get_rooms()
+            
+        # Servers without a lobby channel: cached, refreshed in the background
+        entry = self.fetcher.get(f"{self.server_url}/api/games/active", ttl=ACTIVE_GAMES_TTL)
+        if entry is None or entry.data is None:
+            return []
+        return entry.data.get('games', [])
         
     def disconnect(self):
         """Disconnect from server"""
         if self.connected:
-            self.sio.disconnect()
+            self.disconnect_client()
             self.connected = False
             print("Disconnected from server")
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""Room membership indexed by player id, rebuilt only when it changes.
+
+The network layer refreshes the registry on room_created, player_joined,
+player_left and game_started. Readers on the game thread get O(1) lookups
+of a player's color and slot instead of scanning the players list each
+frame. Each refresh swaps in new dicts, so readers never see a half
+built index.
+"""
+
+# Color for players the registry has not heard of yet
+UNKNOWN_COLOR = (255, 255, 255)
+
+class PlayerInfo:
+    """Static facts about one player in the room"""
+    __slots__ = ('id', 'username', 'color', 'slot')
+    
+    def __init__(self, player_id, username, color, slot):
+        self.id = player_id
+        self.username = username
+        self.color = color
+        self.slot = slot
+
+class PlayerRegistry:
+    def __init__(self):
+        self.players = {}  # player id -> PlayerInfo
+        self.local_id = None  # Our own player id once authenticated
+        self.version = 0  # Bumped on every rebuild
+        
+    def update(self, players):
+        """Rebuild from a room's players list"""
+        index = {}
+        for slot, player in enumerate(players):
+            player_id = player.get('id')
+            color = tuple(player.get('color') or UNKNOWN_COLOR)
+            index[player_id] = PlayerInfo(player_id, player.get('username'), color, slot)
+        self.players = index
+        self.version += 1
+        
+    def get(self, player_id):
+        """PlayerInfo for an id, None when not in the room"""
+        return self.players.get(player_id)
+        
+    def color_of(self, player_id, default=UNKNOWN_COLOR):
+        """Color tuple of a player"""
+        info = self.players.get(player_id)
+        return info.color if info is not None else default
+        
+    def is_local(self, player_id):
+        """Check if an id is our own player"""
+        return player_id is not None and player_id == self.local_id
+        
+    def __len__(self):
+        return len(self.players)
+        
+    def __contains__(self, player_id):
+        return player_id in self.players
\ No newline at end of file
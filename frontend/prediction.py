@@ -0,0 +1,63 @@
+"""History of locally predicted snake moves, for reconciling with the server.
+
+Every simulated tick records the input that drove it and where it left the
+head. When the server's copy of our snake for some tick arrives, the record
+for that tick tells whether the prediction held; if not, the snake is reset
+to the server's body and the recorded inputs after that tick are replayed.
+"""
+from collections import deque
+
+# Ticks of history kept, a few seconds of round trip at the default tick rate
+HISTORY_TICKS = 64
+
+class PredictedTick:
+    """Input and resulting head of one simulated tick"""
+    __slots__ = ('tick', 'direction', 'head', 'length')
+    
+    def __init__(self, tick, direction, head, length):
+        self.tick = tick
+        self.direction = direction
+        self.head = tuple(head)
+        self.length = length
+
+class PredictionBuffer:
+    def __init__(self, capacity=HISTORY_TICKS):
+        self.history = deque(maxlen=capacity)
+        self.confirmed = -1  # Last tick checked against the server
+        self.stats = {
+            'confirmed': 0,
+            'rewinds': 0,
+            'replayed': 0,
+            'expired': 0
+        }
+        
+    def record(self, tick, direction, head, length):
+        """Remember the outcome of a simulated tick"""
+        self.history.append(PredictedTick(tick, direction, head, length))
+        
+    def get(self, tick):
+        """Record for a tick, None when it is not (or no longer) buffered"""
+        if not self.history:
+            return None
+        index = tick - self.history[0].tick
+        if 0 <= index < len(self.history):
+            return self.history[index]
+        return None
+        
+    def after(self, tick):
+        """Records newer than tick, oldest first"""
+        return [entry for entry in self.history if entry.tick > tick]
+        
+    def confirm(self, tick):
+        """Forget records up to tick, the server has seen them"""
+        while self.history and self.history[0].tick <= tick:
+            self.history.popleft()
+        self.confirmed = tick
+        
+    def clear(self):
+        """Drop all records, e.g. after the local snake died"""
+        self.history.clear()
+        
+    def get_stats(self):
+        """Reconciliation counters and current history size"""
+        return dict(self.stats, buffered=len(self.history))
\ No newline at end of file
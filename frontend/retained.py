@@ -0,0 +1,77 @@
+"""Retained-mode presentation for the menu screens.
+
+Menu screens are static most of the time. Each draw call passes the state
+its screen depends on; while that key stays the same nothing is rendered
+or presented. When it changes the screen is redrawn off-display and only
+the bounding box of the pixels that differ from the last presented frame
+is pushed to the window.
+"""
+import pygame
+
+try:
+    import numpy as np
+    import pygame.surfarray
+except ImportError:  # Without NumPy every redraw is presented with a full flip
+    np = None
+
+# Milliseconds the menu loop sleeps in pygame.event.wait when nothing happens,
+# network events and background fetches are picked up at least this often
+IDLE_WAIT_MS = 100
+
+class RetainedScreen:
+    def __init__(self, screen):
+        self.screen = screen
+        self.key = None  # State the visible frame was drawn from
+        self.previous = None  # Pixels of the last presented frame
+        self.stats = {
+            'frames': 0,
+            'redraws': 0,
+            'skipped': 0,
+            'flips': 0,
+            'partial': 0,
+            'unchanged': 0
+        }
+        
+    def changed(self, key):
+        """True when the screen must be redrawn for this state, remembering it"""
+        self.stats['frames'] += 1
+        if self.key is not None and key == self.key:
+            self.stats['skipped'] += 1
+            return False
+        self.key = key
+        self.stats['redraws'] += 1
+        return True
+        
+    def invalidate(self):
+        """Forget the visible frame, after something else drew to the display"""
+        self.key = None
+        self.previous = None
+        
+    def present(self):
+        """Push the redrawn screen, only the region that differs from the last frame"""
+        if np is None:
+            pygame.display.flip()
+            self.stats['flips'] += 1
+            return
+            
+        pixels = pygame.surfarray.array2d(self.screen)
+        previous = self.previous
+        self.previous = pixels
+        if previous is None or previous.shape != pixels.shape:
+            pygame.display.flip()
+            self.stats['flips'] += 1
+            return
+            
+        changed = pixels != previous
+        columns = np.flatnonzero(changed.any(axis=1))
+        if not len(columns):
+            self.stats['unchanged'] += 1
+            return
+        rows = np.flatnonzero(changed.any(axis=0))
+        x, y = int(columns[0]), int(rows[0])
+        pygame.display.update(pygame.Rect(x, y, int(columns[-1]) + 1 - x, int(rows[-1]) + 1 - y))
+        self.stats['partial'] += 1
+        
+    def get_stats(self):
+        """Frames asked for, redrawn and skipped, and how redraws were presented"""
+        return dict(self.stats)
\ No newline at end of file
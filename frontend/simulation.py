@@ -0,0 +1,104 @@
+"""Headless game rules: board, snakes, fruit and collisions, without pygame"""
+import grid
+from grid import Grid
+from fruit_placer import NO_CELL, furthest_free_cell
+
+FRUIT_INTERVAL = 10  # Turns between fruit spawns
+
+class Simulation:
+    def __init__(self, size, block_cells=(), verbose=False):
+        self.size = size
+        self.grid = Grid(size)
+        self.snakes = list()
+        self.local_snake = None
+        self.turn = 0
+        self.game_over = False
+        self.verbose = verbose
+        
+        # Snake colors by grid code, for whoever renders the board
+        self.colors = {}
+        self.next_snake_id = 0
+        
+        # Codes a locally simulated snake cannot move into
+        self.solid = bytearray(code == grid.BLOCK or code & grid.DEAD != 0 for code in range(256))
+        
+        # Called with each position whose grid code changed
+        self.on_cell_changed = None
+        
+        for cell in block_cells:
+            self.set_cell(cell, grid.BLOCK)
+            
+    def add_snake(self, snake):
+        """Add a snake to the game"""
+        self.snakes.append(snake)
+        
+    def add_local_snake(self, snake):
+        """Set the local player's snake"""
+        self.local_snake = snake
+        self.snakes.append(snake)
+        
+    def register_snake(self, color, solid=True):
+        """Allocate a grid code for a snake drawn in the given color"""
+        if self.next_snake_id >= grid.MAX_SNAKES:
+            raise ValueError("Too many snakes for the occupancy grid")
+        code = grid.SNAKE + self.next_snake_id
+        self.next_snake_id += 1
+        self.colors[code] = tuple(color)
+        self.solid[code] = solid
+        return code
+        
+    def set_cell(self, pos, code):
+        """Store an entity code in the grid"""
+        if not self.grid.in_bounds(pos):
+            return
+        self.grid.set(pos, code)
+        if self.on_cell_changed:
+            self.on_cell_changed(pos)
+            
+    def is_blocked(self, pos, tail=None):
+        """Check if moving into pos collides, ignoring a tail that retracts this tick"""
+        if not self.solid[self.grid.get(pos)]:
+            return False
+        return pos != tail
+        
+    def kill2(self, k):
+        """Mark cells where snake died"""
+        for p in k.cells:
+            self.set_cell(p, k.code | grid.DEAD)
+            
+    def kill(self, killed_snake):
+        """Remove snake from game"""
+        if killed_snake in self.snakes:
+            self.snakes.remove(killed_snake)
+            
+        # Check if local player died
+        if killed_snake == self.local_snake:
+            self.game_over = True
+            if self.verbose:
+                print("Local player died!")
+                
+    def get_next_fruit_pos(self):
+        """Calculate optimal fruit position (furthest from all snakes)"""
+        return furthest_free_cell(self.grid.cells, self.size)
+        
+    def spawn_fruit(self):
+        """Spawn a new fruit"""
+        coordinate = self.get_next_fruit_pos()
+        if coordinate != NO_CELL:
+            self.set_cell(coordinate, grid.FRUIT)
+            if self.verbose:
+                print(f"Spawned fruit at {coordinate}")
+        return coordinate
+        
+    def tick(self):
+        """Advance every living snake one step and spawn fruit periodically"""
+        if self.game_over:
+            return
+            
+        for snake in list(self.snakes):
+            if snake.alive:
+                snake.next_move()
+                
+        self.turn += 1
+        if self.turn % FRUIT_INTERVAL == 0:
+            self.spawn_fruit()
\ No newline at end of file
@@ -1,4 +1,5 @@
-import consts
+import grid
+from body import SnakeBody
 
 class Snake:
     dx = {'UP': 0, 'DOWN': 0, 'LEFT': -1, 'RIGHT': 1}
@@ -7,16 +8,18 @@ class Snake:
     def __init__(self, keys, game, pos, color, direction, is_local=False):
         self.length = 1
         self.keys = keys
-        self.cells = [pos]
+        self.cells = SnakeBody(game.size, [pos])
         self.game = game
         self.color = color
         self.direction = direction
+        self.heading = direction  # Direction of the last move actually made
         self.is_local = is_local
         self.alive = True
         self.score = 0
         
         # Set initial position
-        game.get_cell(pos).set_color(color)
+        self.code = game.register_snake(color)
+        game.set_cell(pos, self.code)
         
     def get_head(self):
         """Get head position"""
@@ -46,21 +49,26 @@ class Snake:
     def draw_snake(self, cells):
         """Draw snake on grid"""
         for pos in cells:
-            cell = self.game.get_cell(pos)
-            if cell:
-                cell.set_color(self.color)
+            self.game.set_cell(pos, self.code)
+            
+    def redraw(self):
+        """Repaint the whole body, e.g. after a resync overwrote cells"""
+        self.draw_snake(self.cells)
                 
+    def next_head(self):
+        """Cell the head enters on the next move"""
+        cur = self.get_head()
+        self.xx = Snake.dx[self.direction]
+        self.yy = Snake.dy[self.direction]
+        return Snake.check_table(cur[0] + self.xx, cur[1] + self.yy, self.game.size)
+        
     def next_move(self):
         """Calculate and execute next move"""
         if not self.alive:
             return
             
-        cur = self.get_head()
-        self.xx = Snake.dx[self.direction]
-        self.yy = Snake.dy[self.direction]
-        
-        new_head = (cur[0] + self.xx, cur[1] + self.yy)
-        new_head = Snake.check_table(new_head[0], new_head[1], consts.table_size)
+        new_head = self.next_head()
+        self.heading = self.direction
         
         # Check collisions
         if self.check_collision(new_head):
@@ -68,57 +76,35 @@ class Snake:
             return
             
         # Move snake
-        self.cells.append(new_head)
+        self.cells.push_head(new_head)
         
         # Check if ate fruit
-        if self.game.get_cell(new_head).color == consts.fruit_color:
+        if self.game.grid.is_fruit(new_head):
             self.length += 1
             self.score += 10
             # Fruit will be cleared by next move, no need to remove tail
         else:
             # Remove tail if didn't eat fruit
             if len(self.cells) > self.length:
-                tail = tuple(self.cells.pop(0))
-                self.game.get_cell(tail).set_color(consts.back_color)
+                tail = self.cells.pop_tail()
+                self.game.set_cell(tail, grid.EMPTY)
                 
-        # Draw updated snake
-        self.draw_snake(self.cells)
+        # Only the new head changed, the old tail was cleared above
+        self.game.set_cell(new_head, self.code)
         
     def check_collision(self, pos):
         """Check if position causes collision"""
-        # Check self collision
-        if pos in self.cells:
-            return True
-            
-        # Check block collision
-        if list(pos) in consts.block_cells:
-            return True
-            
-        # Check collision with dead snake cells
-        if pos in self.game.killed_cells:
-            return True
-            
-        # Check collision with other snakes
-        for snake in self.game.snakes:
-            if snake != self and snake.alive:
-                if pos in snake.cells:
-                    return True
-                    
-        return False
+        # The occupancy grid covers self, blocks, dead snakes and other
+        # snakes. Our tail moves away this tick unless we are growing, so
+        # chasing it is allowed.
+        tail = self.cells[0] if len(self.cells) >= self.length else None
+        return self.game.is_blocked(pos, tail)
         
     def die(self):
         """Handle snake death"""
         self.alive = False
         self.game.kill(self)
         self.game.kill2(self)
-        
-        # Color dead snake cells differently
-        for pos in self.cells:
-            cell = self.game.get_cell(pos)
-            if cell:
-                # Darken the color to show it's dead
-                dead_color = [c // 2 for c in self.color]
-                cell.set_color(dead_color)
                 
     def handle(self, keys):
         """Handle keyboard input for direction changes"""
@@ -129,16 +115,17 @@ class Snake:
             if key in self.keys:
                 new_direction = self.keys[key]
                 
-                # Prevent 180-degree turns
-                if new_direction == 'UP' and self.direction != 'DOWN':
+                # Prevent 180-degree turns, checked against the last move made
+                # since several keys may arrive between two ticks
+                if new_direction == 'UP' and self.heading != 'DOWN':
                     self.direction = 'UP'
                     break
-                elif new_direction == 'DOWN' and self.direction != 'UP':
+                elif new_direction == 'DOWN' and self.heading != 'UP':
                     self.direction = 'DOWN'
                     break
-                elif new_direction == 'LEFT' and self.direction != 'RIGHT':
+                elif new_direction == 'LEFT' and self.heading != 'RIGHT':
                     self.direction = 'LEFT'
                     break
-                elif new_direction == 'RIGHT' and self.direction != 'LEFT':
+                elif new_direction == 'RIGHT' and self.heading != 'LEFT':
                     self.direction = 'RIGHT'
                     break
\ No newline at end of file
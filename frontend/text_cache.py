@@ -0,0 +1,80 @@
+"""Shared fonts and an LRU cache of rendered text surfaces.
+
+Menus draw the same labels every frame; rendering glyphs is far more
+expensive than blitting a finished surface, so surfaces are kept keyed by
+(font, text, antialias, color, background) until the byte cap pushes the
+least recently used ones out.
+"""
+from collections import OrderedDict
+import pygame
+
+# Pixel bytes of cached surfaces at most
+TEXT_CACHE_BYTES = 4 * 1024 * 1024
+
+# Fonts loaded so far, keyed by (name, size)
+_fonts = {}
+
+def get_font(size, name=None):
+    """Font instance shared by every caller asking for the same face and size"""
+    key = (name, size)
+    font = _fonts.get(key)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = _fonts[key] = pygame.font.Font(name, size)
+    return font
+
+class TextCache:
+    def __init__(self, max_bytes=TEXT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0
+        }
+        
+    def render(self, font, text, antialias, color, background=None):
+        """Same as font.render, reusing the surface from an earlier identical call"""
+        key = (font, text, antialias, tuple(color), tuple(background) if background else None)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return surface
+            
+        self.stats['misses'] += 1
+        surface = font.render(text, antialias, color, background)
+        size = surface_bytes(surface)
+        if size > self.max_bytes:
+            return surface
+        self.entries[key] = surface
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= surface_bytes(evicted)
+            self.stats['evictions'] += 1
+        return surface
+        
+    def clear(self):
+        """Drop every cached surface"""
+        self.entries.clear()
+        self.bytes = 0
+        
+    def get_stats(self):
+        """Hit, miss and eviction counts plus current memory use"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return dict(
+            self.stats,
+            hit_rate=self.stats['hits'] / lookups if lookups else 0.0,
+            entries=len(self.entries),
+            bytes=self.bytes
+        )
+
+def surface_bytes(surface):
+    """Pixel memory held by a surface"""
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+# Cache shared by every screen, so the cap bounds all cached text together
+shared_cache = TextCache()
\ No newline at end of file
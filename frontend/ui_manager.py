@@ -1,11 +1,34 @@
 import pygame
-import requests
+from http_cache import BackgroundFetcher
+from text_cache import shared_cache
+from retained import RetainedScreen
+
+# Seconds before cached screen data is refreshed in the background
+STATS_TTL = 30
+LEADERBOARD_TTL = 30
+
+def stats_url(server_url, user_id):
+    """REST endpoint for a player's statistics"""
+    return f"{server_url}/api/stats/{user_id}"
+
+def leaderboard_url(server_url):
+    """REST endpoint for the top ten players"""
+    return f"{server_url}/api/leaderboard?limit=10"
+
+def entry_state(entry):
+    """What a screen shows of a cache entry, it changes whenever a response lands"""
+    if entry is None:
+        return None
+    return (entry.fetched_at, entry.status, entry.error)
 
 class UIManager:
-    def __init__(self, screen, font, small_font):
+    def __init__(self, screen, font, small_font, fetcher=None, text=None, retained=None):
         self.screen = screen
+        self.retained = retained or RetainedScreen(screen)  # Redraws screens only when their state changes
         self.font = font
         self.small_font = small_font
+        self.fetcher = fetcher or BackgroundFetcher()
+        self.text = text or shared_cache  # Cached label surfaces
         self.input_text = ""
         self.input_active = False
         self.auth_step = "email"  # "email" or "password"
@@ -14,61 +37,12 @@ class UIManager:
         
     def draw_auth_screen(self, auth_type, auth_manager, events):
         """Draw authentication screen (login/register)"""
-        from consts import back_color, width, height
-        
-        self.screen.fill(back_color)
-        
-        # Title
-        title = auth_type.capitalize()
-        title_text = self.font.render(title, True, (255, 255, 255))
-        title_rect = title_text.get_rect(center=(width // 2, 50))
-        self.screen.blit(title_text, title_rect)
-        
-        # Instructions
-        if self.auth_step == "email":
-            prompt = "Enter your email:"
-        else:
-            prompt = "Enter password (or leave empty for 'password123'):"
-            
-        prompt_text = self.small_font.render(prompt, True, (200, 200, 200))
-        prompt_rect = prompt_text.get_rect(center=(width // 2, 150))
-        self.screen.blit(prompt_text, prompt_rect)
-        
-        instructions = [
-            "Press ENTER to continue",
-            "Press ESC to go back",
-            "",
-            "(Simplified auth - password defaults to 'password123')"
-        ]
-        
-        for i, instruction in enumerate(instructions):
-            inst_text = self.small_font.render(instruction, True, (150, 150, 150))
-            inst_rect = inst_text.get_rect(center=(width // 2, 400 + i * 25))
-            self.screen.blit(inst_text, inst_rect)
-        
-        # Input box
-        input_box = pygame.Rect(width // 2 - 200, 250, 400, 50)
-        color = (100, 150, 255) if self.input_active else (100, 100, 100)
-        pygame.draw.rect(self.screen, color, input_box, 3)
-        
-        # Input text (mask password)
-        display_text = self.input_text
-        if self.auth_step == "password" and self.input_text:
-            display_text = "*" * len(self.input_text)
+        cursor = self.input_active and pygame.time.get_ticks() % 1000 < 500
+        if self.retained.changed(('auth', auth_type, self.auth_step, self.input_text, self.input_active, cursor)):
+            self.render_auth_screen(auth_type, cursor)
+            self.retained.present()
             
-        input_surface = self.small_font.render(display_text, True, (255, 255, 255))
-        self.screen.blit(input_surface, (input_box.x + 10, input_box.y + 15))
-        
-        # Cursor blink
-        if self.input_active and pygame.time.get_ticks() % 1000 < 500:
-            cursor_x = input_box.x + 10 + input_surface.get_width() + 2
-            pygame.draw.line(self.screen, (255, 255, 255), 
-                           (cursor_x, input_box.y + 10), 
-                           (cursor_x, input_box.y + 40), 2)
-        
-        pygame.display.flip()
-        
-        # Handle input from events passed in
+        # Handle input from events passed in, drawn or not
         for event in events:
             if event.type == pygame.KEYDOWN:
                 self.input_active = True
@@ -116,50 +90,77 @@ class UIManager:
                         self.input_text += event.unicode
         
         return None
-    
-    def reset_auth_state(self):
-        """Reset authentication state"""
-        self.input_text = ""
-        self.email = ""
-        self.password = ""
-        self.auth_step = "email"
-        self.input_active = False
         
-    def draw_text_input(self, prompt, events):
-        """Draw text input screen"""
+    def render_auth_screen(self, auth_type, cursor):
+        """Render the authentication screen off-display"""
         from consts import back_color, width, height
         
         self.screen.fill(back_color)
         
-        # Prompt
-        prompt_text = self.font.render(prompt, True, (255, 255, 255))
-        prompt_rect = prompt_text.get_rect(center=(width // 2, 200))
+        # Title
+        title = auth_type.capitalize()
+        title_text = self.text.render(self.font, title, True, (255, 255, 255))
+        title_rect = title_text.get_rect(center=(width // 2, 50))
+        self.screen.blit(title_text, title_rect)
+        
+        # Instructions
+        if self.auth_step == "email":
+            prompt = "Enter your email:"
+        else:
+            prompt = "Enter password (or leave empty for 'password123'):"
+            
+        prompt_text = self.text.render(self.small_font, prompt, True, (200, 200, 200))
+        prompt_rect = prompt_text.get_rect(center=(width // 2, 150))
         self.screen.blit(prompt_text, prompt_rect)
         
+        instructions = [
+            "Press ENTER to continue",
+            "Press ESC to go back",
+            "",
+            "(Simplified auth - password defaults to 'password123')"
+        ]
+        
+        for i, instruction in enumerate(instructions):
+            inst_text = self.text.render(self.small_font, instruction, True, (150, 150, 150))
+            inst_rect = inst_text.get_rect(center=(width // 2, 400 + i * 25))
+            self.screen.blit(inst_text, inst_rect)
+            
         # Input box
-        input_box = pygame.Rect(width // 2 - 200, 300, 400, 50)
+        input_box = pygame.Rect(width // 2 - 200, 250, 400, 50)
         color = (100, 150, 255) if self.input_active else (100, 100, 100)
         pygame.draw.rect(self.screen, color, input_box, 3)
         
-        # Input text
-        input_surface = self.small_font.render(self.input_text, True, (255, 255, 255))
+        # Input text (mask password)
+        display_text = self.input_text
+        if self.auth_step == "password" and self.input_text:
+            display_text = "*" * len(self.input_text)
+            
+        input_surface = self.text.render(self.small_font, display_text, True, (255, 255, 255))
         self.screen.blit(input_surface, (input_box.x + 10, input_box.y + 15))
         
         # Cursor blink
-        if pygame.time.get_ticks() % 1000 < 500:
+        if cursor:
             cursor_x = input_box.x + 10 + input_surface.get_width() + 2
             pygame.draw.line(self.screen, (255, 255, 255), 
                            (cursor_x, input_box.y + 10), 
                            (cursor_x, input_box.y + 40), 2)
+    
+    def reset_auth_state(self):
+        """Reset authentication state"""
+        self.input_text = ""
+        self.email = ""
+        self.password = ""
+        self.auth_step = "email"
+        self.input_active = False
         
-        # Instructions
-        inst_text = self.small_font.render("Press ENTER to submit, ESC to cancel", True, (150, 150, 150))
-        inst_rect = inst_text.get_rect(center=(width // 2, 400))
-        self.screen.blit(inst_text, inst_rect)
-        
-        pygame.display.flip()
-        
-        # Handle input
+    def draw_text_input(self, prompt, events):
+        """Draw text input screen"""
+        cursor = pygame.time.get_ticks() % 1000 < 500
+        if self.retained.changed(('input', prompt, self.input_text, self.input_active, cursor)):
+            self.render_text_input(prompt, cursor)
+            self.retained.present()
+            
+        # Handle input, drawn or not
         for event in events:
             if event.type == pygame.KEYDOWN:
                 self.input_active = True
@@ -184,22 +185,65 @@ class UIManager:
         
         return None
         
+    def render_text_input(self, prompt, cursor):
+        """Render the text input screen off-display"""
+        from consts import back_color, width, height
+        
+        self.screen.fill(back_color)
+        
+        # Prompt
+        prompt_text = self.text.render(self.font, prompt, True, (255, 255, 255))
+        prompt_rect = prompt_text.get_rect(center=(width // 2, 200))
+        self.screen.blit(prompt_text, prompt_rect)
+        
+        # Input box
+        input_box = pygame.Rect(width // 2 - 200, 300, 400, 50)
+        color = (100, 150, 255) if self.input_active else (100, 100, 100)
+        pygame.draw.rect(self.screen, color, input_box, 3)
+        
+        # Input text
+        input_surface = self.text.render(self.small_font, self.input_text, True, (255, 255, 255))
+        self.screen.blit(input_surface, (input_box.x + 10, input_box.y + 15))
+        
+        # Cursor blink
+        if cursor:
+            cursor_x = input_box.x + 10 + input_surface.get_width() + 2
+            pygame.draw.line(self.screen, (255, 255, 255), 
+                           (cursor_x, input_box.y + 10), 
+                           (cursor_x, input_box.y + 40), 2)
+                           
+        # Instructions
+        inst_text = self.text.render(self.small_font, "Press ENTER to submit, ESC to cancel", True, (150, 150, 150))
+        inst_rect = inst_text.get_rect(center=(width // 2, 400))
+        self.screen.blit(inst_text, inst_rect)
+        
+    def prefetch(self, user_id, server_url="http://localhost:3000"):
+        """Start loading the stats and leaderboard screens before they are opened"""
+        self.fetcher.get(stats_url(server_url, user_id), ttl=STATS_TTL)
+        self.fetcher.get(leaderboard_url(server_url), ttl=LEADERBOARD_TTL)
+        
     def draw_stats(self, user_id, server_url="http://localhost:3000"):
         """Draw user statistics screen"""
         from consts import back_color, width, height
         
+        # Stats are fetched in the background, render whatever is cached
+        entry = self.fetcher.get(stats_url(server_url, user_id), ttl=STATS_TTL)
+        if not self.retained.changed(('stats', user_id, entry_state(entry))):
+            return
+            
         self.screen.fill(back_color)
         
         # Title
-        title_text = self.font.render("Your Statistics", True, (255, 255, 255))
+        title_text = self.text.render(self.font, "Your Statistics", True, (255, 255, 255))
         title_rect = title_text.get_rect(center=(width // 2, 50))
         self.screen.blit(title_text, title_rect)
         
-        # Fetch stats
-        try:
-            response = requests.get(f"{server_url}/api/stats/{user_id}", timeout=5)
-            if response.status_code == 200:
-                data = response.json()
+        if entry is None:
+            loading_text = self.text.render(self.small_font, "Loading statistics...", True, (150, 150, 150))
+            self.screen.blit(loading_text, (100, 150))
+        else:
+            if entry.data is not None:
+                data = entry.data
                 stats = data.get('stats', {})
                 recent_games = data.get('recentGames', [])
                 
@@ -213,51 +257,57 @@ class UIManager:
                 ]
                 
                 for item in stat_items:
-                    text = self.small_font.render(item, True, (255, 255, 255))
+                    text = self.text.render(self.small_font, item, True, (255, 255, 255))
                     self.screen.blit(text, (100, stats_y))
                     stats_y += 35
                 
                 # Recent games
                 if recent_games:
-                    recent_title = self.small_font.render("Recent Games:", True, (255, 255, 0))
+                    recent_title = self.text.render(self.small_font, "Recent Games:", True, (255, 255, 0))
                     self.screen.blit(recent_title, (100, stats_y + 20))
                     stats_y += 50
                     
                     for i, game in enumerate(recent_games[:5]):
                         game_text = f"Game {i+1}: Score {game.get('score', 0)}"
-                        text = self.small_font.render(game_text, True, (200, 200, 200))
+                        text = self.text.render(self.small_font, game_text, True, (200, 200, 200))
                         self.screen.blit(text, (120, stats_y))
                         stats_y += 30
+            elif entry.status is not None:
+                error_text = self.text.render(self.small_font, "Failed to load statistics", True, (255, 0, 0))
+                self.screen.blit(error_text, (100, 150))
             else:
-                error_text = self.small_font.render("Failed to load statistics", True, (255, 0, 0))
+                error_text = self.text.render(self.small_font, f"Error: {entry.error}", True, (255, 0, 0))
                 self.screen.blit(error_text, (100, 150))
-        except Exception as e:
-            error_text = self.small_font.render(f"Error: {str(e)}", True, (255, 0, 0))
-            self.screen.blit(error_text, (100, 150))
         
         # Back button
-        back_text = self.small_font.render("Press ESC to go back", True, (150, 150, 150))
+        back_text = self.text.render(self.small_font, "Press ESC to go back", True, (150, 150, 150))
         back_rect = back_text.get_rect(center=(width // 2, height - 50))
         self.screen.blit(back_text, back_rect)
         
-        pygame.display.flip()
+        self.retained.present()
         
     def draw_leaderboard(self, server_url="http://localhost:3000"):
         """Draw leaderboard screen"""
         from consts import back_color, width, height
         
+        # Leaderboard is fetched in the background, render whatever is cached
+        entry = self.fetcher.get(leaderboard_url(server_url), ttl=LEADERBOARD_TTL)
+        if not self.retained.changed(('leaderboard', entry_state(entry))):
+            return
+            
         self.screen.fill(back_color)
         
         # Title
-        title_text = self.font.render("Leaderboard", True, (255, 255, 255))
+        title_text = self.text.render(self.font, "Leaderboard", True, (255, 255, 255))
         title_rect = title_text.get_rect(center=(width // 2, 50))
         self.screen.blit(title_text, title_rect)
         
-        # Fetch leaderboard
-        try:
-            response = requests.get(f"{server_url}/api/leaderboard?limit=10", timeout=5)
-            if response.status_code == 200:
-                data = response.json()
+        if entry is None:
+            loading_text = self.text.render(self.small_font, "Loading leaderboard...", True, (150, 150, 150))
+            self.screen.blit(loading_text, (100, 150))
+        else:
+            if entry.data is not None:
+                data = entry.data
                 leaderboard = data.get('leaderboard', [])
                 
                 # Display leaderboard
@@ -271,22 +321,22 @@ class UIManager:
                     color = (255, 215, 0) if rank == 1 else (192, 192, 192) if rank == 2 else (205, 127, 50) if rank == 3 else (255, 255, 255)
                     
                     text = f"{rank}. {username} - Score: {score}, Wins: {wins}"
-                    text_surface = self.small_font.render(text, True, color)
+                    text_surface = self.text.render(self.small_font, text, True, color)
                     self.screen.blit(text_surface, (100, y_pos))
                     y_pos += 40
+            elif entry.status is not None:
+                error_text = self.text.render(self.small_font, "Failed to load leaderboard", True, (255, 0, 0))
+                self.screen.blit(error_text, (100, 150))
             else:
-                error_text = self.small_font.render("Failed to load leaderboard", True, (255, 0, 0))
+                error_text = self.text.render(self.small_font, f"Error: {entry.error}", True, (255, 0, 0))
                 self.screen.blit(error_text, (100, 150))
-        except Exception as e:
-            error_text = self.small_font.render(f"Error: {str(e)}", True, (255, 0, 0))
-            self.screen.blit(error_text, (100, 150))
         
         # Back button
-        back_text = self.small_font.render("Press ESC to go back", True, (150, 150, 150))
+        back_text = self.text.render(self.small_font, "Press ESC to go back", True, (150, 150, 150))
         back_rect = back_text.get_rect(center=(width // 2, height - 50))
         self.screen.blit(back_text, back_rect)
         
-        pygame.display.flip()
+        self.retained.present()
         
     def check_back_button(self, events):
         """Check if ESC was pressed from events"""
@@ -0,0 +1,33 @@
+"""Binary encoding of snake cells as packed little-endian uint16 indices.
+
+A cell (x, y) on a board of width `size` travels as x * size + y, the same
+flat index the Grid and SnakeBody use. python-socketio sends bytes values
+as binary attachments, so the JSON part of a message stays tiny.
+"""
+import sys
+from array import array
+
+JSON = 'json'
+BINARY = 'binary'
+
+# uint16 indices only reach boards up to 256x256
+MAX_BINARY_SIZE = 256
+
+def supports_binary(size):
+    """Check if a board is small enough for 16-bit cell indices"""
+    return size <= MAX_BINARY_SIZE
+
+def pack(indices):
+    """array('H') of cell indices to wire bytes"""
+    if sys.byteorder == 'big':
+        indices = array('H', indices)
+        indices.byteswap()
+    return indices.tobytes()
+
+def unpack(data):
+    """Wire bytes to an array('H') of cell indices, no per-cell objects"""
+    indices = array('H')
+    indices.frombytes(data)
+    if sys.byteorder == 'big':
+        indices.byteswap()
+    return indices
\ No newline at end of file